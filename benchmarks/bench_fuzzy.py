@@ -0,0 +1,50 @@
+"""
+Top-k fuzzy lookup over 50k distinct course/teacher/location names:
+three thefuzz process.extract passes (old smart_search fallback) versus one rapidfuzz cdist call.
+
+    python benchmarks/bench_fuzzy.py [distinct_names]
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+from thefuzz import process, fuzz
+
+import synthetic  # noqa: F401  (puts the repo root on sys.path)
+from search_index import FUZZY_FIELDS, SearchIndex
+
+CHARS = "计算机组成原理编译操作系统软件工程数据结构网络安全高等数学线性代数概率论英语体育物理化学生命科学导论实验"
+
+
+def random_name(rng):
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(3, 8))) + str(rng.randrange(1000))
+
+
+def main():
+    n_names = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = random.Random(0)
+    per_field = n_names // 3
+    columns = {field: [random_name(rng) for _ in range(per_field)] for field in FUZZY_FIELDS}
+    df = pd.DataFrame(columns).assign(day="Monday", period=1, start_time="08:00", end_time="09:40")
+    index = SearchIndex(df)
+    queries = [random_name(rng)[:4] for _ in range(20)]
+
+    t0 = time.perf_counter()
+    for q in queries:
+        for field in FUZZY_FIELDS:
+            process.extract(q, index.choices[field], limit=3, scorer=fuzz.partial_ratio)
+    thefuzz_s = (time.perf_counter() - t0) / len(queries)
+
+    print(f"distinct names={per_field * 3}")
+    print(f"thefuzz extract x3:   {thefuzz_s * 1000:.1f} ms/query")
+    for workers in (1, -1):
+        t0 = time.perf_counter()
+        for q in queries:
+            index.fuzzy_matches(q, workers=workers)
+        cdist_s = (time.perf_counter() - t0) / len(queries)
+        print(f"rapidfuzz cdist (workers={workers:>2}): {cdist_s * 1000:.1f} ms/query  ({thefuzz_s / cdist_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Peak memory and time of a schedule upload: the old whole-file read_csv + validate + save
+versus the streaming schedule_import.import_csv. Each variant runs in a fresh child process
+so its max RSS can be compared.
+
+    python benchmarks/bench_import.py [rows]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import make_schedule
+from schedule_import import import_csv
+from schedule_schema import normalize_schedule, to_csv_frame
+
+
+def peak_rss_mb():
+    # VmHWM starts over at exec (ru_maxrss would carry over the parent's peak)
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+
+
+def whole_file(src, dest):
+    df = normalize_schedule(pd.read_csv(src, dtype=str))
+    to_csv_frame(df).to_csv(dest, index=False)
+
+
+def child(mode, src, dest):
+    t0 = time.perf_counter()
+    if mode == "whole":
+        whole_file(src, dest)
+    else:
+        import_csv(src, dest)
+    elapsed = time.perf_counter() - t0
+    print(f"{elapsed:.2f} {peak_rss_mb():.0f}")
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "upload.csv")
+        # Written in pieces so generating the input does not dominate memory either
+        for start in range(0, n_rows, 500_000):
+            make_schedule(min(500_000, n_rows - start), seed=start).to_csv(
+                src, mode="a", header=start == 0, index=False)
+        print(f"rows={n_rows}  upload={os.path.getsize(src) / 1e6:.0f} MB")
+
+        # Baseline: interpreter + pandas/pyarrow imports, no data
+        baseline = subprocess.run([sys.executable, __file__, "--baseline"],
+                                  capture_output=True, text=True, check=True).stdout
+        print(f"imports only:              peak {float(baseline):6.0f} MB")
+        for mode, label in (("whole", "read_csv whole file:     "), ("stream", "import_csv (streaming):  ")):
+            out = subprocess.run([sys.executable, __file__, "--child", mode, src, os.path.join(tmp, f"{mode}.csv")],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            print(f"{label}  peak {float(out[1]):6.0f} MB  {float(out[0]):6.2f} s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+    elif len(sys.argv) > 1 and sys.argv[1] == "--baseline":
+        print(f"{peak_rss_mb():.0f}")
+    else:
+        main()
@@ -0,0 +1,97 @@
+"""
+Reminder throughput with many subscribers: every owner in a SQLite schedule database has
+reminders on, with a lead time of a week so that each class is due at once. Measures one
+ReminderShard in this process, then the sharded worker (shard processes feeding one
+dispatch queue) for several shard counts.
+
+    python benchmarks/bench_reminder_shards.py [owners] [classes_per_owner] [max_shards]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from synthetic import make_typed_schedule
+from reminder_subscriptions import SubscriptionStore
+from reminder_worker import ReminderShard, ShardedReminderWorker
+from schedule_db import ScheduleDatabase, SQLiteScheduleStore
+
+WEEK_MINUTES = 7 * 24 * 60
+
+
+def fill(tmp, n_owners, per_owner):
+    db = ScheduleDatabase(os.path.join(tmp, "schedule.db"))
+    subscriptions = SubscriptionStore(os.path.join(tmp, "reminders.db"))
+    schedules = make_typed_schedule(n_owners * per_owner, n_courses=400, n_teachers=150, n_locations=80)
+    for i in range(n_owners):
+        owner = f"student{i}"
+        db.replace(owner, [schedules.iloc[i * per_owner:(i + 1) * per_owner]])
+        settings = {"enabled": True, "remind_before": WEEK_MINUTES, "wechat_enabled": True,
+                    "wechat_webhook": f"https://example.invalid/hook/{i}", "tzname": "Asia/Shanghai"}
+        subscriptions.put(SQLiteScheduleStore(db, owner), f"subscriber{i}", settings)
+    return subscriptions
+
+
+def run_sharded(subscriptions, shards, expected):
+    received = [0]
+    done = threading.Event()
+
+    def count(due):
+        received[0] += len(due)
+        if received[0] >= expected:
+            done.set()
+
+    worker = ShardedReminderWorker(subscriptions.path, shards, poll_interval=0.2, send=count)
+    t0 = time.perf_counter()
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    done.wait()
+    elapsed = time.perf_counter() - t0
+    worker.stop()
+    thread.join()
+    worker._shards_stop.set()
+    for process in worker._processes:
+        process.join()
+    return received[0], elapsed
+
+
+def main():
+    n_owners = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_owner = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    max_shards = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    cores = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        subscriptions = fill(tmp, n_owners, per_owner)
+        expected = n_owners * per_owner
+
+        shard = ReminderShard(subscriptions)
+        t0 = time.perf_counter()
+        shard.sync()
+        sync_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        due, _ = shard.step()
+        first_s = time.perf_counter() - t0
+        # A fresh shard over the same (process-wide) stores: class times are cached, only timers are built
+        shard = ReminderShard(subscriptions)
+        shard.sync()
+        t0 = time.perf_counter()
+        again, _ = shard.step()
+        rebuild_s = time.perf_counter() - t0
+
+        print(f"owners={n_owners}  classes/owner={per_owner}  reminders={expected}  cores={cores}")
+        print(f"one shard, in process: sync {sync_s * 1000:.0f} ms; "
+              f"first pass (read schedules + timers) {len(due) / first_s:,.0f} reminders/s; "
+              f"timers only {len(again) / rebuild_s:,.0f} reminders/s")
+        shards = 1
+        while shards <= max_shards:
+            received, elapsed = run_sharded(subscriptions, shards, expected)
+            per_core = received / elapsed / min(shards, cores)
+            print(f"{shards} shard process(es): {received} reminders in {elapsed:.2f} s "
+                  f"(incl. process start) = {received / elapsed:,.0f}/s, {per_core:,.0f} reminders computed per second per core")
+            shards *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Per-query cost of preparing get_ai_response's context: rendering the result with
+to_string() and scanning the text (old path) versus summarize() on the rows.
+
+    python benchmarks/bench_response_context.py
+"""
+import time
+
+from synthetic import make_schedule
+from schedule_schema import normalize_schedule
+from assistant import summarize
+
+
+def legacy_context(result_df):
+    context_data = result_df.to_string(index=False)
+    course_count = len(context_data.strip().split('\n')) - 1
+    is_morning = "08:" in context_data or "09:" in context_data
+    is_evening = "19:" in context_data or "20:" in context_data
+    is_weekend = "Saturday" in context_data or "Sunday" in context_data
+    return course_count, is_morning, is_evening, is_weekend
+
+
+def timed(fn, arg, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    full = make_schedule(50_000)
+    typed = normalize_schedule(full)
+    for n_rows in (100, 1_000, 10_000, 50_000):
+        result_df = full.iloc[:n_rows]
+        typed_df = typed.iloc[:n_rows]
+        repeat = max(3, 3000 // n_rows)
+        legacy_s = timed(legacy_context, result_df, repeat)
+        summary_s = timed(summarize, typed_df, repeat)
+        assert summarize(typed_df).count == legacy_context(result_df)[0]
+        print(f"rows={n_rows:>6}  to_string+scan: {legacy_s * 1000:8.2f} ms   summarize: {summary_s * 1000:6.2f} ms  ({legacy_s / summary_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
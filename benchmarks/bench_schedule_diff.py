@@ -0,0 +1,65 @@
+"""
+Editing one class in a large schedule: full rebuild of the schedule index, search index
+(with its content lines) and every subscription's reminder timers, versus diffing the new
+version against the old one and patching only what changed.
+
+    python benchmarks/bench_schedule_diff.py [rows] [subscriptions]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_schedule
+from reminders import ReminderScheduler
+from schedule_index import ScheduleIndex
+from schedule_store import ScheduleStore
+from search_index import SearchIndex
+
+
+def refresh(store, scheduler, patch):
+    """Everything the app and the reminder thread redo after a new schedule version."""
+    t0 = time.perf_counter()
+    store.derived("schedule_index", ScheduleIndex, ScheduleIndex.patched if patch else None)
+    index = store.derived("search_index", SearchIndex, SearchIndex.patched if patch else None)
+    index.content
+    if not patch:
+        scheduler._dirty.update(scheduler.subscriptions())
+    scheduler._collect_due()
+    return time.perf_counter() - t0
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_subs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedule_data.csv")
+        raw = make_schedule(n_rows)
+        raw.to_csv(path, index=False)
+
+        store = ScheduleStore(path, columnar_cache=False)
+        scheduler = ReminderScheduler(store)
+        # Subscriptions added directly (no reminder thread polls this scheduler): _collect_due() is driven by hand below
+        for i in range(n_subs):
+            scheduler._subscriptions[f"user{i}"] = {"enabled": True, "remind_before": 30}
+            scheduler._dirty.add(f"user{i}")
+        refresh(store, scheduler, patch=False)
+
+        results = {}
+        for patch in (False, True, False, True):
+            # One class moves to another room
+            raw.loc[n_rows // 2, "location"] = f"R{time.perf_counter_ns()}"
+            store.import_csv(io.StringIO(raw.to_csv(index=False)))
+            t0 = time.perf_counter()
+            store.get()
+            parse_s = time.perf_counter() - t0
+            results.setdefault(patch, []).append(refresh(store, scheduler, patch))
+
+        print(f"rows={n_rows}  subscriptions={n_subs}  (CSV parse {parse_s * 1000:.0f} ms either way)")
+        print(f"full rebuild:   {min(results[False]) * 1000:8.1f} ms")
+        print(f"diff + patch:   {min(results[True]) * 1000:8.1f} ms  ({min(results[False]) / min(results[True]):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Cold start of ScheduleStore: parsing and validating the CSV versus mapping the Arrow
+columnar cache written next to it. Each "cold" load uses a fresh store, as a new
+worker process would.
+
+    python benchmarks/bench_schedule_load.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_schedule
+from schedule_store import ScheduleStore
+
+
+def timed_load(path, columnar_cache, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        store = ScheduleStore(path, columnar_cache=columnar_cache)
+        t0 = time.perf_counter()
+        df = store.get()
+        best = min(best, time.perf_counter() - t0)
+    return best, df, store
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedule_data.csv")
+        make_schedule(n_rows).to_csv(path, index=False)
+
+        csv_s, parsed, _ = timed_load(path, columnar_cache=False)
+
+        # First load with the cache enabled parses the CSV and writes the Arrow file
+        store = ScheduleStore(path)
+        t0 = time.perf_counter()
+        store.get()
+        first_s = time.perf_counter() - t0
+
+        cold_s, mapped, store = timed_load(path, columnar_cache=True)
+        assert mapped.equals(parsed)
+
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            store.get()
+        warm_s = (time.perf_counter() - t0) / 1000
+
+        print(f"rows={n_rows}  csv={os.path.getsize(path) / 1e6:.1f} MB  "
+              f"arrow={os.path.getsize(store.cache_path) / 1e6:.1f} MB")
+        print(f"cold, CSV parse + validate:  {csv_s * 1000:8.1f} ms")
+        print(f"first load, parse + write:   {first_s * 1000:8.1f} ms  (once per CSV change)")
+        print(f"cold, mapped Arrow cache:    {cold_s * 1000:8.1f} ms  ({csv_s / cold_s:.0f}x)")
+        print(f"warm, stat check only:       {warm_s * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Many students on one node: one shared CSV holding every timetable versus the SQLite
+backend with one schedule per owner.
+
+    python benchmarks/bench_sqlite_store.py [owners] [classes_per_owner]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import make_typed_schedule
+from schedule_db import SQLiteScheduleStore, ScheduleDatabase
+from schedule_schema import DAY_ORDER, to_csv_frame
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    n_owners = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    per_owner = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    schedules = make_typed_schedule(n_owners * per_owner, n_courses=400, n_teachers=150, n_locations=80)
+    owners = [f"student{i}" for i in range(n_owners)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ScheduleDatabase(os.path.join(tmp, "schedule.db"))
+        t0 = time.perf_counter()
+        for i, owner in enumerate(owners):
+            db.replace(owner, [schedules.iloc[i * per_owner:(i + 1) * per_owner]])
+        fill_s = time.perf_counter() - t0
+
+        # The CSV equivalent: every owner's rows in one file, with an owner column
+        csv_path = os.path.join(tmp, "schedule_data.csv")
+        everything = to_csv_frame(schedules).assign(owner=[o for o in owners for _ in range(per_owner)])
+        write_csv = lambda: everything.to_csv(csv_path, index=False)
+        write_csv()
+
+        rng = random.Random(0)
+        one = schedules.iloc[:per_owner]
+        lookups = [(rng.choice(owners), rng.choice(DAY_ORDER), rng.randrange(24 * 60)) for _ in range(2000)]
+        lookup_s = timed(lambda: db.lookup(*lookups[rng.randrange(len(lookups))]), 2000)
+        teacher = str(one["teacher"].iloc[0])
+        teacher_s = timed(lambda: db.by_teacher(rng.choice(owners), teacher), 500)
+        load_s = timed(lambda: SQLiteScheduleStore(db, rng.choice(owners)).get(), 200)
+        store = SQLiteScheduleStore(db, owners[0])
+        store.get()
+        warm_s = timed(store.get, 2000)
+        save_s = timed(lambda: db.replace(rng.choice(owners), [one]), 100)
+
+        def read_csv_owner():
+            df = pd.read_csv(csv_path, dtype=str)
+            return df[df["owner"] == owners[0]]
+
+        csv_read_s = timed(read_csv_owner, 3)
+        csv_write_s = timed(write_csv, 3)
+
+        print(f"owners={n_owners}  rows={len(schedules)}  (filled in {fill_s:.1f} s)")
+        print(f"status lookup (indexed):       {lookup_s * 1e6:8.0f} us")
+        print(f"classes by teacher (indexed):  {teacher_s * 1e6:8.0f} us")
+        print(f"load one owner, cold:          {load_s * 1000:8.2f} ms   shared CSV, parse + filter: {csv_read_s * 1000:6.0f} ms")
+        print(f"load one owner, unchanged:     {warm_s * 1e6:8.0f} us   (version check)")
+        print(f"save one owner:                {save_s * 1000:8.2f} ms   shared CSV, rewrite:        {csv_write_s * 1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Current/next class lookup: per-call filter + sort + iterrows (old get_status_and_next_class)
+versus the per-weekday bisect index.
+
+    python benchmarks/bench_status_index.py [rows]
+"""
+import sys
+import time
+
+from synthetic import DAYS, make_schedule
+from schedule_schema import normalize_schedule
+from schedule_index import ScheduleIndex
+
+
+def legacy_lookup(df, weekday_en, current_time_str):
+    today_classes = df[df['day'] == weekday_en].copy()
+    if today_classes.empty:
+        return "Free", None
+    today_classes = today_classes.sort_values("start_time")
+    for _, row in today_classes.iterrows():
+        start = row['start_time']
+        end = row['end_time']
+        if start <= current_time_str <= end:
+            return "In Class", row['course_name']
+        if start > current_time_str:
+            return "Upcoming", row['course_name']
+    return "Done", None
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = make_schedule(n_rows)
+    probes = [(DAYS[i % 7], f"{h:02d}:{m:02d}") for i, (h, m) in enumerate((h, m) for h in range(7, 23) for m in (0, 17, 45))]
+
+    typed = normalize_schedule(df)
+    t0 = time.perf_counter()
+    index = ScheduleIndex(typed)
+    build_s = time.perf_counter() - t0
+
+    legacy_probes = probes[:10]
+    t0 = time.perf_counter()
+    legacy = [legacy_lookup(df, day, t) for day, t in legacy_probes]
+    legacy_s = (time.perf_counter() - t0) / len(legacy_probes)
+
+    t0 = time.perf_counter()
+    for day, t in probes:
+        h, m = map(int, t.split(":"))
+        index.lookup(day, h * 60 + m)
+    index_s = (time.perf_counter() - t0) / len(probes)
+
+    # Both paths must agree
+    for (day, t), (status, course) in zip(legacy_probes, legacy):
+        h, m = map(int, t.split(":"))
+        got_status, cur, nxt, _ = index.lookup(day, h * 60 + m)
+        row = cur if got_status == "In Class" else nxt
+        assert got_status == status and (row['course_name'] if row is not None else None) == course, (day, t)
+
+    print(f"rows={n_rows}")
+    print(f"index build (once per schedule version): {build_s * 1000:.1f} ms")
+    print(f"legacy lookup: {legacy_s * 1000:.2f} ms/call")
+    print(f"index lookup:  {index_s * 1e6:.2f} us/call  ({legacy_s / index_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
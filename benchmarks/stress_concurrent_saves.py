@@ -0,0 +1,111 @@
+"""
+Stress test for concurrent schedule saves: writer processes keep saving whole schedules
+through ScheduleStore.save while reader processes keep loading the file. Every schedule a
+writer saves is tagged (all rows share one course name that encodes its row count), so a
+reader can tell a complete file from a truncated or interleaved one.
+
+    python benchmarks/stress_concurrent_saves.py [writers] [readers] [saves_per_writer]
+    python benchmarks/stress_concurrent_saves.py --legacy   # old in-place df.to_csv for comparison
+
+Exits non-zero if any reader saw a broken file, the version went backwards, or saves were lost.
+"""
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import make_schedule
+from schedule_store import ScheduleStore
+
+
+def tagged_schedule(writer, i):
+    n_rows = 200 + (writer * 7919 + i * 104729) % 3000
+    df = make_schedule(n_rows, seed=writer * 1000 + i)
+    df["course_name"] = f"w{writer}-{i}-{n_rows}"
+    return df
+
+
+def writer(path, writer_id, saves, legacy):
+    store = ScheduleStore(path, columnar_cache=False)
+    for i in range(saves):
+        df = tagged_schedule(writer_id, i)
+        if legacy:
+            df.to_csv(path, index=False)
+        else:
+            store.save(df)
+
+
+def check(df):
+    """None if df is one complete tagged schedule, otherwise what is wrong with it."""
+    names = df["course_name"].astype(str).unique()
+    if len(names) != 1:
+        return f"mixed content: {len(names)} tags"
+    expected = int(names[0].rsplit("-", 1)[1])
+    if len(df) != expected:
+        return f"truncated: {len(df)} of {expected} rows"
+    return None
+
+
+def reader(path, stop, results, legacy):
+    store = ScheduleStore(path, columnar_cache=False)
+    reads, broken, last_version, backwards = 0, [], 0, 0
+    while not stop.is_set():
+        version = store.disk_version()
+        if version < last_version:
+            backwards += 1
+        last_version = version
+        try:
+            # The raw file as any reader sees it, then the store's parsed copy
+            problem = check(pd.read_csv(path, dtype=str)) or (None if legacy else check(store.get()))
+        except Exception as e:
+            problem = f"{type(e).__name__}: {str(e).strip()}"
+        reads += 1
+        if problem:
+            broken.append(problem)
+    results.put((reads, broken, backwards))
+
+
+def main():
+    legacy = "--legacy" in sys.argv
+    args = [int(a) for a in sys.argv[1:] if not a.startswith("--")]
+    n_writers, n_readers, saves = (args + [4, 8, 50][len(args):])[:3]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedule_data.csv")
+        ScheduleStore(path).save(tagged_schedule(0, -1))
+        start_version = ScheduleStore(path).disk_version()
+
+        ctx = mp.get_context("spawn")
+        stop, results = ctx.Event(), ctx.Queue()
+        readers = [ctx.Process(target=reader, args=(path, stop, results, legacy)) for _ in range(n_readers)]
+        writers = [ctx.Process(target=writer, args=(path, w, saves, legacy)) for w in range(n_writers)]
+        t0 = time.perf_counter()
+        for p in readers + writers:
+            p.start()
+        for p in writers:
+            p.join()
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        outcomes = [results.get() for _ in readers]
+        for p in readers:
+            p.join()
+
+        reads = sum(o[0] for o in outcomes)
+        broken = [b for o in outcomes for b in o[1]]
+        backwards = sum(o[2] for o in outcomes)
+        lost = 0 if legacy else start_version + n_writers * saves - ScheduleStore(path).disk_version()
+
+        mode = "legacy in-place to_csv" if legacy else "locked atomic save"
+        print(f"{mode}: {n_writers} writers x {saves} saves, {n_readers} readers, {elapsed:.1f} s")
+        print(f"reads: {reads}  broken: {len(broken)}  version went backwards: {backwards}  lost saves: {lost}")
+        for problem in sorted(set(broken))[:5]:
+            print("  e.g.", problem)
+        if broken or backwards or lost:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Synthetic multi-student timetables for the benchmark scripts."""
+import os
+import random
+import sys
+
+# Allow `python benchmarks/<script>.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from schedule_schema import normalize_schedule
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+PERIOD_STARTS = ["08:00", "10:00", "14:00", "16:00", "19:00"]
+PERIOD_ENDS = ["09:40", "11:40", "15:40", "17:40", "21:25"]
+
+
+def make_schedule(n_rows, n_courses=2000, n_teachers=800, n_locations=300, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        period = rng.randrange(len(PERIOD_STARTS))
+        # Jitter start/end so classes overlap the way they do across many students
+        shift = rng.choice([0, 5, 10, 15, 20, 25, 30])
+        sh, sm = map(int, PERIOD_STARTS[period].split(":"))
+        eh, em = map(int, PERIOD_ENDS[period].split(":"))
+        start = sh * 60 + sm + shift
+        end = eh * 60 + em + shift
+        rows.append((
+            rng.choice(DAYS),
+            period + 1,
+            f"{start // 60:02d}:{start % 60:02d}",
+            f"{end // 60:02d}:{end % 60:02d}",
+            f"课程{rng.randrange(n_courses)}",
+            f"N{rng.randrange(n_locations)}",
+            f"教师{rng.randrange(n_teachers)}",
+        ))
+    return pd.DataFrame(rows, columns=["day", "period", "start_time", "end_time", "course_name", "location", "teacher"])
+
+
+def make_typed_schedule(n_rows, **kwargs):
+    """make_schedule() in the typed in-memory form the app works on."""
+    return normalize_schedule(make_schedule(n_rows, **kwargs))
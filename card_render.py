@@ -0,0 +1,64 @@
+import html
+
+from schedule_schema import TIME_LABELS, WEEKDAYS_CN
+
+# Cards sent per page; "加载更多" adds another page
+CARD_PAGE_SIZE = 20
+
+# No indentation or blank lines: the cards are joined into one markdown HTML block
+WEEKLY_CARD = (
+    '<div style="background: white; padding: 15px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); margin-bottom: 10px;">'
+    '<div style="display: grid; grid-template-columns: 1fr 2fr 1fr; gap: 15px; align-items: center;">'
+    '<div style="font-weight: bold; color: #6366f1;">⏰ {start} - {end}</div>'
+    '<div style="font-weight: bold; color: #1e293b;">📚 {course}</div>'
+    '<div style="color: #64748b;">📍 {location}</div>'
+    '</div></div>'
+)
+
+RESULT_CARD = (
+    '<div style="background: white; padding: 20px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); margin-bottom: 15px; transition: transform 0.2s;">'
+    '<div style="display: grid; grid-template-columns: auto 1fr auto; gap: 20px; align-items: center;">'
+    '<div style="text-align: center;">'
+    '<div style="font-size: 14px; color: #64748b;">{day}</div>'
+    '<div style="font-size: 18px; font-weight: bold; color: #6366f1;">{start}</div>'
+    '</div>'
+    '<div>'
+    '<h4 style="margin: 0 0 8px 0; color: #1e293b;">{course}</h4>'
+    '<div style="display: flex; gap: 20px; font-size: 14px; color: #64748b;">'
+    '<span>📍 {location}</span>'
+    '<span>👨‍🏫 {teacher}</span>'
+    '</div>'
+    '</div>'
+    '<div style="font-size: 24px; color: #6366f1;">📚</div>'
+    '</div></div>'
+)
+
+
+def _times(rows, column):
+    return TIME_LABELS[rows[column].to_numpy()].tolist()
+
+
+def _text(rows, column):
+    # Schedule text comes from uploaded files: escape it before it goes into raw HTML
+    return [html.escape(str(value)) for value in rows[column].tolist()]
+
+
+def weekly_cards_html(rows):
+    """One HTML block with a 本周课表 card per row of `rows` (typed schedule rows)."""
+    return "".join(
+        WEEKLY_CARD.format(start=start, end=end, course=course, location=location)
+        for start, end, course, location in zip(
+            _times(rows, "start_min"), _times(rows, "end_min"), _text(rows, "course_name"), _text(rows, "location")
+        )
+    )
+
+
+def result_cards_html(rows):
+    """One HTML block with a 查询结果 card per row of `rows` (typed schedule rows)."""
+    days = [WEEKDAYS_CN[day] for day in rows["day"].tolist()]
+    return "".join(
+        RESULT_CARD.format(day=day, start=start, course=course, location=location, teacher=teacher)
+        for day, start, course, location, teacher in zip(
+            days, _times(rows, "start_min"), _text(rows, "course_name"), _text(rows, "location"), _text(rows, "teacher")
+        )
+    )
@@ -0,0 +1,190 @@
+"""
+The 📊 学情分析 / 📈 图表分析 charts, compiled to Vega-Lite once per schedule version.
+
+Building an Altair chart and validating it into a spec (to_dict) is most of what a chart
+costs a rerun, and it used to happen on every visit. chart_spec() does it once and returns
+a plain spec dict for st.vega_lite_chart, with the chart data already serialized to Arrow
+under "datasets" (the form st.altair_chart sends), so a rerun ships the cached spec as is.
+The data is reduced first: one heatmap cell per (day, period) instead of one per class and
+at most MAX_CATEGORIES bars / slices per chart.
+"""
+import hashlib
+import threading
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+COLOR_SCHEME = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#06b6d4', '#84cc16']
+PERIOD_COLORS = {'上午': '#6366f1', '下午': '#8b5cf6', '晚上': '#ec4899'}
+WEEKDAY_LABELS = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+# Bars / donut slices per chart; the smallest ones beyond that are summed into "其他"
+MAX_CATEGORIES = 30
+OTHER_LABEL = "其他"
+
+_compile_lock = threading.Lock()
+
+
+def axis(**kwargs):
+    return alt.Axis(tickColor='#e2e8f0', domainColor='#e2e8f0', **kwargs)
+
+
+def arrow_bytes(df):
+    """Arrow IPC stream of `df`, as Streamlit ships chart data to the browser."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.RecordBatchStreamWriter(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def top_categories(frame, label, value, limit=MAX_CATEGORIES):
+    """`frame` with its rows past the `limit - 1` largest `value`s summed into one OTHER_LABEL row."""
+    if len(frame) <= limit:
+        return frame
+    order = frame[value].sort_values(ascending=False, kind="stable").index
+    kept = frame.loc[order[:limit - 1]]
+    other = pd.DataFrame({label: [OTHER_LABEL], value: [frame.loc[order[limit - 1:], value].sum()]})
+    return pd.concat([kept[[label, value]], other], ignore_index=True)
+
+
+def heatmap_cells(heatmap_df):
+    """
+    One row per (day, period) cell. The marks of a cell are drawn on top of each other, so
+    the last class of a cell is the one on screen (and in the tooltip): keep that one.
+    """
+    cells = heatmap_df[['day_cn', 'period', 'course_name', 'location', 'teacher', 'short_name']]
+    return cells.drop_duplicates(['day_cn', 'period'], keep='last')
+
+
+def heatmap_chart(data):
+    base = alt.Chart(data).encode(
+        x=alt.X('day_cn:N', title=None, sort=WEEKDAY_LABELS, axis=axis(labelAngle=0, labelFontSize=12)),
+        y=alt.Y('period:O', title='节次', sort='ascending',
+                axis=axis(titleAngle=0, titleAlign="right", titleY=15, labelFontSize=12)),
+    ).properties(
+        height=400,
+        width='container'
+    )
+    rects = base.mark_rect(cornerRadius=10, stroke='#ffffff', strokeWidth=2).encode(
+        color=alt.Color('course_name:N', legend=None, scale=alt.Scale(range=COLOR_SCHEME)),
+        tooltip=[
+            alt.Tooltip('day_cn', title='星期'),
+            alt.Tooltip('period', title='节次'),
+            alt.Tooltip('course_name', title='课程名称'),
+            alt.Tooltip('location', title='上课地点'),
+            alt.Tooltip('teacher', title='任课教师')
+        ]
+    )
+    text = base.mark_text(baseline='middle', size=12, fontWeight='bold', color='white').encode(
+        text=alt.Text('short_name'),
+    )
+    return alt.layer(rects, text).properties(background='#ffffff').configure_view(strokeWidth=0)
+
+
+def donut_chart(data, center):
+    base = alt.Chart(data).encode(
+        theta=alt.Theta("count", stack=True)
+    )
+    pie = base.mark_arc(outerRadius=100, innerRadius=60, cornerRadius=10).encode(
+        color=alt.Color("course_name", legend=None, scale=alt.Scale(range=COLOR_SCHEME)),
+        order=alt.Order("count", sort="descending"),
+        tooltip=[
+            alt.Tooltip('course_name', title='课程名称'),
+            alt.Tooltip('count', title='节数')
+        ]
+    )
+    text = base.mark_text(radius=120, fontSize=14, fontWeight='bold', color='#64748b').encode(
+        text="count",
+        order=alt.Order("count", sort="descending"),
+    )
+    center_text = alt.Chart(center).mark_text(
+        fontSize=16, fontWeight='bold', color='#1e293b'
+    ).encode(
+        text='text'
+    )
+    return alt.layer(pie, text, center_text).properties(background='#ffffff').configure_view(strokeWidth=0)
+
+
+def bar_chart(data, x, x_title, y, y_title, x_sort, color_scale, label_size=12):
+    return alt.Chart(data).mark_bar(cornerRadius=10).encode(
+        x=alt.X(f'{x}:N', title=x_title, sort=x_sort, axis=axis(labelAngle=0, labelFontSize=label_size)),
+        y=alt.Y(f'{y}:Q', title=y_title, axis=axis(labelFontSize=12)),
+        color=alt.Color(f'{x}:N', legend=None, scale=color_scale),
+        tooltip=[
+            alt.Tooltip(x, title=x_title),
+            alt.Tooltip(y, title=y_title)
+        ]
+    ).properties(
+        height=300,
+        width='container',
+        background='#ffffff'
+    ).configure_view(
+        strokeWidth=0
+    )
+
+
+def daily_chart(data):
+    return bar_chart(data, 'day_cn', '星期', 'count', '课程数量', WEEKDAY_LABELS, alt.Scale(range=COLOR_SCHEME))
+
+
+def time_period_chart(data):
+    periods = list(PERIOD_COLORS)
+    scale = alt.Scale(domain=periods, range=[PERIOD_COLORS[p] for p in periods])
+    return bar_chart(data, 'time_period', '时间段', 'count', '课程数量', periods, scale)
+
+
+def teacher_chart(data):
+    return bar_chart(data, 'teacher', '教师', 'count', '课程数量', '-y', alt.Scale(range=COLOR_SCHEME), label_size=11)
+
+
+def duration_chart(data):
+    return bar_chart(data, 'course_name', '课程名称', 'total_duration', '学时 (分钟)', '-y',
+                     alt.Scale(range=COLOR_SCHEME), label_size=11)
+
+
+# chart type -> (frames it draws, reduced to what the chart shows; chart builder).
+# The frames come from analytics.course_stats: (heatmap_df, course_counts, total_courses,
+# daily_counts, teacher_counts, time_period_counts, course_duration)
+CHARTS = {
+    "heatmap": (lambda stats: [heatmap_cells(stats[0])], heatmap_chart),
+    "course_donut": (
+        lambda stats: [top_categories(stats[1], 'course_name', 'count'), pd.DataFrame([{'text': '总计'}])],
+        donut_chart,
+    ),
+    "daily": (lambda stats: [stats[3][['day_cn', 'count']]], daily_chart),
+    "time_period": (lambda stats: [stats[5]], time_period_chart),
+    "teacher": (lambda stats: [top_categories(stats[4], 'teacher', 'count')], teacher_chart),
+    "duration": (lambda stats: [top_categories(stats[6], 'course_name', 'total_duration')], duration_chart),
+}
+
+
+def _to_named_arrow(data, datasets):
+    """Altair data transformer: the frame goes into `datasets` as Arrow, the chart refers to it by name."""
+    data = arrow_bytes(data.reset_index(drop=True))
+    # Named by content: a new schedule version with the same chart data keeps the name
+    name = hashlib.md5(data).hexdigest()
+    datasets[name] = data
+    return {"name": name}
+
+
+alt.data_transformers.register("named_arrow", _to_named_arrow)
+
+
+def chart_spec(kind, stats):
+    """
+    Vega-Lite spec of chart `kind` (a CHARTS key) over the course_stats aggregates `stats`,
+    or None when there is nothing to draw. The spec is shared: hand it to st.vega_lite_chart
+    (which copies what it changes), don't modify it.
+    """
+    reduce, build = CHARTS[kind]
+    if stats[0] is None:
+        return None
+    chart = build(*reduce(stats))
+    datasets = {}
+    # Themes and data transformers are process-global; Streamlit's own styling applies instead of the theme
+    with _compile_lock, alt.theme.enable("none"), alt.data_transformers.enable("named_arrow", datasets=datasets):
+        spec = chart.to_dict()
+    spec["datasets"] = datasets
+    return spec
@@ -0,0 +1,380 @@
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import yagmail
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# WeChat Work robots reject text messages over 2048 bytes
+WECHAT_MAX_BYTES = 2048
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def split_batches(messages, max_bytes=WECHAT_MAX_BYTES, sep="\n\n"):
+    """Join messages into as few payloads as possible, each under max_bytes (utf-8)."""
+    batches, current, size = [], [], 0
+    sep_size = len(sep.encode("utf-8"))
+    for message in messages:
+        message_size = len(message.encode("utf-8"))
+        if current and size + sep_size + message_size > max_bytes:
+            batches.append(sep.join(current))
+            current, size = [], 0
+        size += message_size + (sep_size if current else 0)
+        current.append(message)
+    if current:
+        batches.append(sep.join(current))
+    return batches
+
+
+class WebhookDispatcher:
+    """
+    Background delivery for webhook notifications, so a slow endpoint never blocks the
+    reminder loop.
+
+    - submit() only enqueues; the queue is bounded and drops (and logs) when full
+    - messages for the same webhook arriving within `coalesce_window` seconds are sent as one post
+    - at most `per_endpoint` requests are in flight per webhook URL
+    - posts share one pooled requests.Session, use a timeout and retry with exponential backoff
+    """
+
+    def __init__(self, max_queue=1000, workers=4, per_endpoint=2, timeout=(3.05, 10),
+                 retries=3, backoff=0.5, coalesce_window=1.0, session=None):
+        self.max_queue = max_queue
+        self.per_endpoint = per_endpoint
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.coalesce_window = coalesce_window
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # url -> (first_enqueued_at, [messages])
+        self._queued = 0
+        self._inflight = {}
+        self._closed = False
+        self._flushing = 0
+        self._thread = threading.Thread(target=self._run, name="webhook-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, url, message):
+        """Queue a message; returns False when the queue is full or the dispatcher is closed."""
+        with self._cond:
+            if self._closed or self._queued >= self.max_queue:
+                logger.warning("通知队列已满，丢弃消息: %s", url)
+                return False
+            if url not in self._pending:
+                self._pending[url] = (time.monotonic(), [])
+            self._pending[url][1].append(message)
+            self._queued += 1
+            self._cond.notify()
+            return True
+
+    def flush(self, timeout=None):
+        """Send everything queued right away and wait for it to finish."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._queued or self._inflight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=10):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False)
+
+    def _take_ready(self):
+        """Pop batches whose coalescing window has passed and whose endpoint has capacity."""
+        now = time.monotonic()
+        ready, wake_at = [], None
+        for url in list(self._pending):
+            first_at, messages = self._pending[url]
+            due_at = first_at if self._flushing else first_at + self.coalesce_window
+            if due_at > now:
+                wake_at = due_at if wake_at is None else min(wake_at, due_at)
+                continue
+            capacity = self.per_endpoint - self._inflight.get(url, 0)
+            if capacity <= 0:
+                continue  # Picked up again when one of its posts finishes
+            del self._pending[url]
+            self._queued -= len(messages)
+            batches = split_batches(messages)
+            if len(batches) > capacity:
+                # Already-joined payloads wait for the endpoint to free up
+                self._pending[url] = (first_at, batches[capacity:])
+                self._queued += len(batches) - capacity
+                batches = batches[:capacity]
+            for text in batches:
+                ready.append((url, text))
+            self._inflight[url] = self._inflight.get(url, 0) + len(batches)
+        return ready, wake_at
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                ready, wake_at = self._take_ready()
+                for url, text in ready:
+                    self._executor.submit(self._deliver, url, text)
+                if ready:
+                    continue
+                self._cond.wait(None if wake_at is None else max(wake_at - time.monotonic(), 0))
+
+    def _deliver(self, url, text):
+        try:
+            self.post(url, text)
+        finally:
+            with self._cond:
+                self._inflight[url] -= 1
+                if not self._inflight[url]:
+                    del self._inflight[url]
+                self._cond.notify_all()
+
+    def post(self, url, text):
+        """Post one text payload with retries; returns True on success."""
+        payload = {
+            "msgtype": "text",
+            "text": {
+                "content": text
+            }
+        }
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    logger.info("微信提醒已发送")
+                    return True
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception as e:
+                logger.error("微信发送失败: %s", e)
+                return False
+            if attempt < self.retries:
+                time.sleep(self.backoff * (2 ** attempt))
+        logger.error("微信发送失败（已重试 %d 次）: %s", self.retries, error)
+        return False
+
+
+EmailOutcome = namedtuple("EmailOutcome", ["to", "subject", "ok", "error"])
+
+
+def smtp_settings_from_env():
+    """SMTP settings from SMTP_HOST / SMTP_PORT / SMTP_USER / SMTP_PASSWORD / SMTP_SSL / SMTP_STARTTLS, or None."""
+    host = os.environ.get("SMTP_HOST")
+    user = os.environ.get("SMTP_USER")
+    if not host or not user:
+        return None
+    ssl = os.environ.get("SMTP_SSL", "1") not in ("0", "false", "False")
+    starttls = os.environ.get("SMTP_STARTTLS")
+    return {
+        "user": user,
+        "password": os.environ.get("SMTP_PASSWORD"),
+        "host": host,
+        "port": os.environ.get("SMTP_PORT"),
+        "smtp_ssl": ssl,
+        "smtp_starttls": None if starttls is None else starttls not in ("0", "false", "False"),
+        "smtp_skip_login": not os.environ.get("SMTP_PASSWORD"),
+    }
+
+
+class SMTPPool:
+    """
+    Reusable logged-in yagmail connections.
+
+    yagmail.SMTP.send() logs in again on every call; here a connection is opened once and
+    reused until it has been idle longer than `idle_timeout` (servers drop idle sessions)
+    or a NOOP shows it is gone, in which case it is transparently replaced.
+    """
+
+    def __init__(self, size=2, idle_timeout=60, **smtp_kwargs):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.smtp_kwargs = smtp_kwargs
+        self._idle = []  # [(connection, last_used)]
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = yagmail.SMTP(**self.smtp_kwargs)
+        conn.login()
+        return conn
+
+    def _alive(self, conn, last_used):
+        if time.monotonic() - last_used > self.idle_timeout:
+            return False
+        try:
+            return conn.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            if self._alive(conn, last_used):
+                return conn
+            conn.close()
+        return self._connect()
+
+    def release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def discard(self, conn):
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+    def send_batch(self, messages):
+        """
+        Send [(to, subject, content)] over one SMTP session.
+        Returns one EmailOutcome per message; a dropped connection is reopened once per message.
+        """
+        outcomes = []
+        conn = None
+        try:
+            for i, (to, subject, content) in enumerate(messages):
+                error = None
+                for attempt in range(2):
+                    if conn is None:
+                        try:
+                            conn = self.acquire()
+                        except Exception as e:
+                            # Server unreachable or login rejected: fail the rest of the batch at once
+                            error = str(e) or e.__class__.__name__
+                            outcomes.extend(EmailOutcome(t, s, False, error) for t, s, _ in messages[i:])
+                            return outcomes
+                    try:
+                        recipients, msg = conn.prepare_send(to, subject, content)
+                        refused = conn.smtp.sendmail(conn.user, recipients, msg)
+                        error = f"refused: {refused}" if refused else None
+                        break
+                    except (smtplib.SMTPServerDisconnected, OSError) as e:
+                        self.discard(conn)
+                        conn = None
+                        error = str(e) or e.__class__.__name__
+                    except Exception as e:
+                        error = str(e) or e.__class__.__name__
+                        break
+                outcomes.append(EmailOutcome(to, subject, error is None, error))
+        finally:
+            if conn is not None:
+                self.release(conn)
+        return outcomes
+
+
+class EmailDispatcher:
+    """
+    Background email delivery. Reminders queued within `batch_window` seconds of each other
+    (in practice: everything due in the same minute) go out in one pooled SMTP session.
+    Per-message outcomes are logged and passed to `on_result` if given.
+    """
+
+    def __init__(self, pool, max_queue=1000, batch_window=1.0, on_result=None):
+        self.pool = pool
+        self.batch_window = batch_window
+        self.on_result = on_result
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="email-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, to, subject, content):
+        try:
+            self._queue.put_nowait((to, subject, content))
+            return True
+        except queue.Full:
+            logger.warning("邮件队列已满，丢弃消息: %s", to)
+            return False
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been sent."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            time.sleep(self.batch_window)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                outcomes = self.pool.send_batch(batch)
+            except Exception as e:
+                outcomes = [EmailOutcome(to, subject, False, str(e)) for to, subject, _ in batch]
+            for outcome in outcomes:
+                if outcome.ok:
+                    logger.info("邮件提醒已发送到 %s", outcome.to)
+                else:
+                    logger.error("邮件发送失败 %s: %s", outcome.to, outcome.error)
+            if self.on_result is not None:
+                self.on_result(outcomes)
+            for _ in batch:
+                self._queue.task_done()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_webhook_dispatcher():
+    """Process-wide WebhookDispatcher shared by every reminder."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WebhookDispatcher()
+        return _dispatcher
+
+
+_email_dispatcher = None
+
+
+def get_email_dispatcher():
+    """Process-wide EmailDispatcher, or None when SMTP is not configured."""
+    global _email_dispatcher
+    with _dispatcher_lock:
+        if _email_dispatcher is None:
+            settings = smtp_settings_from_env()
+            if settings is None:
+                return None
+            _email_dispatcher = EmailDispatcher(SMTPPool(**settings))
+        return _email_dispatcher
@@ -0,0 +1,164 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+DEFAULT_REMINDER_DB = "reminders.db"
+
+SCHEMA = """
+-- One row per subscriber of a schedule (a CSV file, or one owner in a schedule database)
+CREATE TABLE IF NOT EXISTS subscriptions (
+    key TEXT PRIMARY KEY,
+    schedule_path TEXT NOT NULL,
+    owner TEXT,
+    subscriber TEXT,
+    settings TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+-- Bumped by every write, so the reminder worker polls one row instead of the whole table
+CREATE TABLE IF NOT EXISTS subscriptions_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+"""
+# Rows remember the store version they were written at, so pollers only reload what changed
+VERSION_INDEX = "CREATE INDEX IF NOT EXISTS subscriptions_by_version ON subscriptions (version)"
+
+
+def reminder_db_path():
+    """REMINDER_DB, else the schedule database (SCHEDULE_DB), else reminders.db."""
+    return os.environ.get("REMINDER_DB") or os.environ.get("SCHEDULE_DB") or DEFAULT_REMINDER_DB
+
+
+def new_subscriber_id():
+    """Random subscriber id; whoever knows it can read and change that subscriber's addresses."""
+    return uuid.uuid4().hex
+
+
+def subscription_key(store, subscriber):
+    return f"{store.key}|{subscriber}"
+
+
+class SubscriptionStore:
+    """
+    Reminder settings kept in SQLite (WAL mode) instead of process memory, so the Streamlit
+    process only reads and writes them and a separate reminder worker (reminder_worker.py)
+    picks them up. A schedule can have any number of subscribers, each with their own
+    settings under a persistent subscriber id (see subscription_key), and every row remembers
+    where its schedule lives (store.location) so the worker can open it on its own.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or reminder_db_path()
+        self._local = threading.local()
+        conn = self.connection()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(subscriptions)")}
+        if "version" not in columns:
+            conn.execute("ALTER TABLE subscriptions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "subscriber" not in columns:
+            self._disable_shared_rows(conn)
+        conn.execute(VERSION_INDEX)
+
+    def connection(self):
+        # Same as ScheduleDatabase: one connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self):
+        row = self.connection().execute("SELECT version FROM subscriptions_version WHERE id = 0").fetchone()
+        return 0 if row is None else row[0]
+
+    def _disable_shared_rows(self, conn):
+        """
+        Older databases kept one row per schedule, shared by everyone who opened it. Nobody
+        can reach those settings any more, so they are switched off and their addresses
+        dropped rather than left sending reminders no one can turn off.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while this one waited for the write lock
+            if "subscriber" in {row[1] for row in conn.execute("PRAGMA table_info(subscriptions)")}:
+                conn.execute("COMMIT")
+                return
+            conn.execute("ALTER TABLE subscriptions ADD COLUMN subscriber TEXT")
+            if conn.execute("SELECT 1 FROM subscriptions LIMIT 1").fetchone() is not None:
+                conn.execute("UPDATE subscriptions SET settings = ?, version = ?",
+                             (json.dumps({"enabled": False}), self._bump(conn)))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, store, subscriber):
+        """Settings `subscriber` saved for a schedule store, None if there are none."""
+        row = self.connection().execute(
+            "SELECT settings FROM subscriptions WHERE key = ?", (subscription_key(store, subscriber),)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, store, subscriber, settings):
+        """Save a subscriber's reminder settings for a schedule store; a no-op if they did not change."""
+        key = subscription_key(store, subscriber)
+        settings = json.dumps(settings, ensure_ascii=False, sort_keys=True)
+        path, owner = store.location
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT settings FROM subscriptions WHERE key = ?", (key,)).fetchone()
+            changed = row is None or row[0] != settings
+            if changed:
+                conn.execute(
+                    "INSERT OR REPLACE INTO subscriptions (key, schedule_path, owner, subscriber, settings, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, path, owner, subscriber, settings, self._bump(conn)),
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return changed
+
+    @staticmethod
+    def _bump(conn):
+        return conn.execute(
+            "INSERT INTO subscriptions_version (id, version) VALUES (0, 1) "
+            "ON CONFLICT (id) DO UPDATE SET version = version + 1 RETURNING version"
+        ).fetchone()[0]
+
+    def changes(self, since=0):
+        """
+        (version, {key: (schedule_path, owner, settings)}) of the subscriptions written after
+        version `since` (all of them for 0), read from a single snapshot. Reminders are turned
+        off by saving enabled=False, never by deleting the row, so nothing is missed.
+        """
+        conn = self.connection()
+        conn.execute("BEGIN")
+        try:
+            version = self.version()
+            rows = conn.execute(
+                "SELECT key, schedule_path, owner, settings FROM subscriptions WHERE version > ?", (since,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return version, {key: (path, owner, json.loads(settings)) for key, path, owner, settings in rows}
+
+
+_subscription_stores = {}
+_subscription_lock = threading.Lock()
+
+
+def get_subscription_store(path=None):
+    """Process-wide SubscriptionStore per database file."""
+    path = path or reminder_db_path()
+    with _subscription_lock:
+        store = _subscription_stores.get(os.path.abspath(path))
+        if store is None:
+            store = _subscription_stores[os.path.abspath(path)] = SubscriptionStore(path)
+        return store
@@ -0,0 +1,276 @@
+"""
+Headless reminder worker: reads reminder settings from the subscription store, opens the
+schedules they refer to and runs the reminder schedulers, without a browser or a Streamlit
+script attached. Run one per node (e.g. as a systemd unit) and start the app with
+REMINDER_WORKER=1 so the UI only reads and writes settings.
+
+    python -m reminder_worker [--db reminders.db] [--poll 5] [--shards N]
+
+With --shards N the subscriptions are split across N processes by a hash of their key.
+Each shard drives its own schedulers (and timer heaps) from one loop and hands the due
+reminders back to this process, which sends them all through one set of notifier pools.
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import time
+import zlib
+
+from notifier import get_email_dispatcher, get_webhook_dispatcher
+from reminder_subscriptions import SubscriptionStore, get_subscription_store
+from reminders import ReminderScheduler, get_reminder_scheduler, reminder_loop, send_reminders
+from schedule_db import get_sqlite_store
+from schedule_store import get_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 5
+
+
+def open_store(schedule_path, owner):
+    """Schedule store for a subscription's (schedule file, owner) location."""
+    if owner is None:
+        return get_store(schedule_path)
+    return get_sqlite_store(owner, schedule_path)
+
+
+def shard_of(key, shards):
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(key.encode()) % shards
+
+
+def flush_dispatchers(timeout=10):
+    """Send whatever reminders are still queued in the notifier pools."""
+    get_webhook_dispatcher().close(timeout)
+    email = get_email_dispatcher()
+    if email is not None:
+        email.flush(timeout)
+
+
+class ReminderWorker:
+    """
+    Keeps one ReminderScheduler per subscribed schedule in sync with the subscription store;
+    they all run on the process's one reminder thread (reminders.reminder_loop). Polling is
+    one primary-key read of the store's version; only the subscriptions written since the
+    last poll are reloaded.
+    """
+
+    def __init__(self, subscriptions, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.subscriptions = subscriptions
+        self.poll_interval = poll_interval
+        self._version = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def sync(self):
+        with self._lock:
+            if self.subscriptions.version() == self._version:
+                return
+            version, rows = self.subscriptions.changes(self._version)
+            for key, (schedule_path, owner, settings) in rows.items():
+                scheduler = self._active.get(key)
+                if not settings.get("enabled", False):
+                    if scheduler is not None:
+                        self._active.pop(key).unregister(key)
+                        # The last subscriber of a schedule: stop polling it and let its snapshot go
+                        reminder_loop.remove(scheduler)
+                    continue
+                if scheduler is None:
+                    scheduler = self._active[key] = get_reminder_scheduler(open_store(schedule_path, owner))
+                scheduler.register(key, settings)
+            self._version = version
+            logger.info("提醒设置已更新（版本 %s，%d 个课表启用提醒）", version, len(self._active))
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("读取提醒设置失败")
+            self._stop.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self, timeout=10):
+        """Stop the reminder thread and send whatever reminders are still queued."""
+        reminder_loop.stop()
+        reminder_loop.join(timeout)
+        flush_dispatchers(timeout)
+
+
+class ReminderShard:
+    """
+    The subscriptions whose key hashes to shard `index` of `shards`, each with a
+    ReminderScheduler of its own (not the shared reminder_loop ones). One heap of (next poll time, generation, key) decides which of them
+    step() polls, so a shard holding tens of thousands of schedules is still one thread.
+    """
+
+    def __init__(self, subscriptions, index=0, shards=1, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.subscriptions = subscriptions
+        self.index = index
+        self.shards = shards
+        self.poll_interval = poll_interval
+        self._version = 0
+        self._schedulers = {}
+        # A key's queued wake-ups go stale when it is re-registered or removed. Generations
+        # come from one counter, so a key that is disabled and enabled again never gets a
+        # number one of its stale wake-ups still carries
+        self._generations = {}
+        self._next_generation = itertools.count(1)
+        self._wakeups = []
+
+    def __len__(self):
+        return len(self._schedulers)
+
+    def sync(self):
+        if self.subscriptions.version() == self._version:
+            return
+        version, rows = self.subscriptions.changes(self._version)
+        for key, (schedule_path, owner, settings) in rows.items():
+            if shard_of(key, self.shards) != self.index:
+                continue
+            if not settings.get("enabled", False):
+                scheduler = self._schedulers.pop(key, None)
+                if scheduler is not None:
+                    # Releases its snapshot lease (CSV schedules), so that version can go idle
+                    scheduler.close()
+                self._generations.pop(key, None)
+                continue
+            scheduler = self._schedulers.get(key)
+            if scheduler is None:
+                scheduler = self._schedulers[key] = ReminderScheduler(open_store(schedule_path, owner))
+            scheduler.register(key, settings)
+            generation = self._generations[key] = next(self._next_generation)
+            heapq.heappush(self._wakeups, (0, generation, key))
+        self._version = version
+
+    def step(self):
+        """Poll every scheduler that is due: ([(settings, message)], seconds until the next one is)."""
+        due = []
+        now = time.time()
+        while self._wakeups and self._wakeups[0][0] <= now:
+            _, generation, key = heapq.heappop(self._wakeups)
+            if self._generations.get(key) != generation:
+                continue
+            batch, timeout = self._schedulers[key].poll()
+            due.extend(batch)
+            heapq.heappush(self._wakeups, (now + timeout, generation, key))
+        timeout = self._wakeups[0][0] - time.time() if self._wakeups else self.poll_interval
+        return due, min(max(timeout, 0), self.poll_interval)
+
+
+def run_shard(db_path, index, shards, results, stop, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Shard process: compute due reminders and put them on `results` in batches."""
+    # systemd signals the whole unit; the parent decides when shards stop
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shard = ReminderShard(SubscriptionStore(db_path), index, shards, poll_interval)
+    while not stop.is_set():
+        try:
+            shard.sync()
+        except Exception:
+            logger.exception("分片 %d 读取提醒设置失败", index)
+        due, timeout = shard.step()
+        if due:
+            results.put(due)
+        stop.wait(timeout)
+
+
+class ShardedReminderWorker:
+    """Runs `shards` ReminderShard processes and sends the reminders they compute."""
+
+    def __init__(self, db_path, shards, poll_interval=DEFAULT_POLL_INTERVAL, send=send_reminders):
+        self.db_path = db_path
+        self.shards = shards
+        self.poll_interval = poll_interval
+        self.send = send
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._shards_stop = self._ctx.Event()
+        self._processes = [None] * shards
+        self._stop = threading.Event()
+
+    def _start(self, index):
+        process = self._ctx.Process(
+            target=run_shard, name=f"reminder-shard-{index}", daemon=True,
+            args=(self.db_path, index, self.shards, self._results, self._shards_stop, self.poll_interval),
+        )
+        process.start()
+        self._processes[index] = process
+
+    def run(self):
+        for index in range(self.shards):
+            self._start(index)
+        while not self._stop.is_set():
+            try:
+                self.send(self._results.get(timeout=1))
+            except queue.Empty:
+                for index, process in enumerate(self._processes):
+                    if not process.is_alive():
+                        logger.error("提醒分片 %d 已退出（退出码 %s），正在重启", index, process.exitcode)
+                        self._start(index)
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self, timeout=10):
+        """Stop the shards, send what they already computed and flush the notifier pools."""
+        self._shards_stop.set()
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+        while True:
+            try:
+                self.send(self._results.get(timeout=0.1))
+            except queue.Empty:
+                break
+        flush_dispatchers(timeout)
+
+
+_embedded = None
+_embedded_lock = threading.Lock()
+
+
+def get_embedded_worker():
+    """
+    ReminderWorker running in a daemon thread of this process, for when no separate worker
+    is deployed (the default `streamlit run app.py` setup).
+    """
+    global _embedded
+    with _embedded_lock:
+        if _embedded is None:
+            _embedded = ReminderWorker(get_subscription_store())
+            threading.Thread(target=_embedded.run, name="reminder-worker", daemon=True).start()
+        return _embedded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="课程提醒后台进程")
+    parser.add_argument("--db", help="提醒设置数据库（默认 REMINDER_DB / SCHEDULE_DB / reminders.db）")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL, help="检查设置变化的间隔（秒）")
+    parser.add_argument("--shards", type=int, default=1, help="计算提醒的进程数（按订阅哈希分片）")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    subscriptions = get_subscription_store(args.db)
+    if args.shards > 1:
+        worker = ShardedReminderWorker(subscriptions.path, args.shards, poll_interval=args.poll)
+    else:
+        worker = ReminderWorker(subscriptions, poll_interval=args.poll)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: worker.stop())
+    logger.info("提醒进程已启动，设置数据库：%s，分片数：%d", subscriptions.path, max(args.shards, 1))
+    worker.run()
+    worker.shutdown()
+    logger.info("提醒进程已退出")
+
+
+if __name__ == "__main__":
+    main()
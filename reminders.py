@@ -0,0 +1,392 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from notifier import get_email_dispatcher, get_webhook_dispatcher
+from schedule_snapshot import snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TZ = "Asia/Shanghai"
+
+
+def send_email_reminder(to_email, subject, content):
+    """Queue an email reminder; reminders due together share one pooled SMTP session"""
+    dispatcher = get_email_dispatcher()
+    if dispatcher is None:
+        logger.warning("未配置 SMTP（SMTP_HOST / SMTP_USER），无法发送邮件到 %s", to_email)
+        return False
+    return dispatcher.submit(to_email, subject, content)
+
+
+def send_wechat_reminder(webhook_url, message):
+    """Queue a WeChat reminder; delivery (pooling, retries, coalescing) happens in the notifier thread pool"""
+    return get_webhook_dispatcher().submit(webhook_url, message)
+
+
+def now_in(tzname):
+    try:
+        return datetime.now(ZoneInfo(tzname or DEFAULT_TZ))
+    except Exception:
+        return datetime.now().astimezone()
+
+
+def next_class_start(now, weekday, start_minute):
+    """Next occurrence (strictly after `now`) of a weekly class, in now's timezone."""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = midnight + timedelta(days=(weekday - now.weekday()) % 7, minutes=start_minute)
+    if start <= now:
+        start += timedelta(days=7)
+    return start
+
+
+def reminder_message(course_name, location, minutes_left):
+    return f"课程提醒：{course_name} 将在 {minutes_left} 分钟后开始，地点：{location}"
+
+
+def dispatch_reminder(settings, message):
+    # Send email reminder if configured
+    if settings.get("email_enabled", False) and settings.get("email"):
+        send_email_reminder(settings["email"], "课程提醒", message)
+
+    # Send WeChat reminder if configured
+    if settings.get("wechat_enabled", False) and settings.get("wechat_webhook"):
+        send_wechat_reminder(settings["wechat_webhook"], message)
+
+
+class ReminderScheduler:
+    """
+    Fires reminders for every subscription registered on one schedule store.
+
+    Instead of scanning the schedule every minute, the next fire time of every class
+    (class start - remind_before) is pushed onto a heap, and poll() pops whatever is due
+    and says how long until the earliest next one. Events for a subscription are only
+    recomputed when its settings change; a new schedule version only queues the classes it
+    added and drops the ones it removed, so editing one class does not reschedule every
+    timer. Each class occurrence is reminded once.
+
+    A scheduler has no thread of its own: the process's ReminderLoop (or a worker shard,
+    see reminder_worker.ReminderShard) polls it, and `on_change` tells the caller that it
+    needs polling now. Registering the same key again just replaces the settings.
+    """
+
+    def __init__(self, store, refresh_interval=60, on_change=None):
+        self.store = store
+        # Upper bound on how long a schedule file change can go unnoticed
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self._last_check = 0.0
+        self._subscriptions = {}
+        # From one counter: a key registered again after unregister() never reuses a
+        # generation its stale queued events still carry
+        self._generations = {}
+        self._next_generation = itertools.count(1)
+        # key -> {class: start timestamp of the occurrence last reminded}. Only the next
+        # occurrence of a class is ever queued, so one entry per class is enough to not remind
+        # it twice, and firing next week's occurrence replaces this week's
+        self._fired = {}
+        self._dirty = set()
+        self._heap = []
+        self._seq = itertools.count()
+        self._classes = None
+        # class -> schedule epoch it was added in; queued events of removed (or re-added) classes go stale
+        self._class_epochs = {}
+        self._epoch = 0
+        self._check_schedule = True
+        self._lease = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def register(self, key, settings):
+        settings = dict(settings)
+        with self._lock:
+            if self._subscriptions.get(key) == settings:
+                return
+            self._subscriptions[key] = settings
+            self._dirty.add(key)
+        self._changed()
+
+    def unregister(self, key):
+        with self._lock:
+            if self._subscriptions.pop(key, None) is not None:
+                # Queued events for this key are dropped lazily when they reach the top of the heap
+                self._generations.pop(key, None)
+                self._fired.pop(key, None)
+                self._dirty.discard(key)
+
+    def subscriptions(self):
+        with self._lock:
+            return dict(self._subscriptions)
+
+    def notify_schedule_changed(self):
+        with self._lock:
+            self._check_schedule = True
+        self._changed()
+
+    def close(self):
+        """Stop firing and release the schedule snapshot; for a scheduler nothing polls any more."""
+        with self._lock:
+            self._closed = True
+            self._heap = []
+            lease, self._lease = self._lease, None
+        if lease is not None:
+            lease.release()
+
+    def poll(self):
+        """(due [(settings, message)], seconds until it needs polling again)."""
+        with self._lock:
+            if time.time() - self._last_check >= self.refresh_interval:
+                # Periodic check: a cheap stat() for an edited schedule file
+                self._check_schedule = True
+        due = self._collect_due()
+        with self._lock:
+            return due, self._next_timeout()
+
+    def _load_classes(self):
+        try:
+            # The SQLite store reads the class times straight from the database
+            class_times = getattr(self.store, "class_times", None)
+            if class_times is not None:
+                return class_times()
+            # Otherwise from the snapshot the sessions share; the lease keeps it counted as in use
+            lease = snapshot_cache.acquire(self.store)
+            if self._lease is not None:
+                self._lease.release()
+            self._lease = lease
+            return lease.snapshot.class_times
+        except Exception as e:
+            logger.error("读取课程表失败: %s", e)
+            return self._classes if self._classes is not None else []
+
+    def _push(self, key, generation, settings, cls, start, now_ts):
+        fire_ts = start.timestamp() - settings.get("remind_before", 30) * 60
+        heapq.heappush(self._heap, (max(fire_ts, now_ts), next(self._seq), key, generation, cls, start,
+                                    self._class_epochs[cls]))
+
+    def _queue_classes(self, key, classes):
+        """Queue the next occurrence of each class for one subscription. Caller holds the lock."""
+        settings = self._subscriptions.get(key)
+        if not settings or not settings.get("enabled", False):
+            return
+        now = now_in(settings.get("tzname"))
+        now_ts = now.timestamp()
+        fired = self._fired.setdefault(key, {})
+        for cls in classes:
+            start = next_class_start(now, cls[0], cls[1])
+            if fired.get(cls) == start.timestamp():
+                start += timedelta(days=7)
+            self._push(key, self._generations[key], settings, cls, start, now_ts)
+
+    def _apply_classes(self, classes):
+        """
+        Switch to a new class list. Caller holds the lock. Returns the classes that are new,
+        which every subscription not being rebuilt anyway still has to queue.
+        """
+        self._epoch += 1
+        current = set(classes)
+        removed = set(self._class_epochs) - current
+        for cls in removed:
+            del self._class_epochs[cls]
+        if removed:
+            # A removed class never fires again; keep its entry only while it could come back
+            # before the occurrence already reminded has started
+            now_ts = time.time()
+            for fired in self._fired.values():
+                for cls in [c for c, start_ts in fired.items() if c not in current and start_ts <= now_ts]:
+                    del fired[cls]
+        added = [cls for cls in current if cls not in self._class_epochs]
+        for cls in added:
+            self._class_epochs[cls] = self._epoch
+        self._classes = classes
+        return added
+
+    def _schedule(self, key):
+        """(Re)build the queued events of one subscription. Caller holds the lock."""
+        self._generations[key] = next(self._next_generation)
+        self._queue_classes(key, self._class_epochs)
+
+    def _compact(self):
+        # Drop superseded events once they make up most of the heap
+        live = len(self._class_epochs) * sum(1 for s in self._subscriptions.values() if s.get("enabled", False))
+        if len(self._heap) > 2 * live + 64:
+            self._heap = [e for e in self._heap if self._live(e)]
+            heapq.heapify(self._heap)
+
+    def _collect_due(self):
+        """Pop every due event; returns [(settings, message)] to send outside the lock."""
+        due = []
+        with self._lock:
+            if self._closed:
+                return due
+            if self._check_schedule or self._dirty:
+                classes = self._load_classes()
+                self._check_schedule = False
+                self._last_check = time.time()
+                if classes is not self._classes:
+                    added = self._apply_classes(classes)
+                    for key in self._subscriptions.keys() - self._dirty:
+                        self._queue_classes(key, added)
+                for key in self._dirty:
+                    self._schedule(key)
+                self._dirty.clear()
+                self._compact()
+
+            now_ts = time.time()
+            while self._heap and self._heap[0][0] <= now_ts:
+                event = heapq.heappop(self._heap)
+                if not self._live(event):
+                    continue  # Stale: settings changed or the class was removed since this was queued
+                _, _, key, generation, cls, start, _ = event
+                settings = self._subscriptions[key]
+                fired = self._fired[key]
+                start_ts = start.timestamp()
+                if start_ts > now_ts:
+                    minutes_left = max(1, round((start_ts - now_ts) / 60))
+                    due.append((settings, reminder_message(cls[2], cls[3], minutes_left)))
+                    fired[cls] = start_ts
+                elif cls in fired and fired[cls] <= now_ts:
+                    # Missed (e.g. the process was asleep); what was reminded before has started
+                    del fired[cls]
+                # Same class next week
+                self._push(key, generation, settings, cls, start + timedelta(days=7), now_ts)
+        return due
+
+    def _live(self, event):
+        _, _, key, generation, cls, _, epoch = event
+        return self._generations.get(key) == generation and self._class_epochs.get(cls) == epoch
+
+    def _next_timeout(self):
+        timeout = self.refresh_interval
+        if self._heap:
+            timeout = min(timeout, self._heap[0][0] - time.time())
+        return max(timeout, 0)
+
+
+def send_reminders(due):
+    for settings, message in due:
+        try:
+            dispatch_reminder(settings, message)
+        except Exception:
+            logger.exception("提醒发送失败")
+
+
+class ReminderLoop:
+    """
+    The one reminder thread of a process. It drives a ReminderScheduler per schedule store
+    (one per owner with the SQLite backend) through poll(), sleeping until whichever is due
+    first, so the thread count stays at one however many schedules have subscribers.
+    """
+
+    def __init__(self, send=send_reminders):
+        self.send = send
+        self._schedulers = {}
+        # store key -> time it is due for a poll; heap entries that disagree with it are stale
+        self._due_at = {}
+        self._wakeups = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scheduler(self, store):
+        """The scheduler of `store`, created (and the thread started) on first use."""
+        with self._cond:
+            scheduler = self._schedulers.get(store.key)
+            if scheduler is None:
+                scheduler = self._schedulers[store.key] = ReminderScheduler(
+                    store, on_change=lambda key=store.key: self.wake(key))
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+                self._thread.start()
+            return scheduler
+
+    def schedulers(self):
+        with self._cond:
+            return dict(self._schedulers)
+
+    def remove(self, scheduler):
+        """
+        Stop polling `scheduler` if nobody is subscribed to it any more, and close it so its
+        snapshot lease lets that schedule version go idle. Returns whether it was removed.
+        """
+        key = scheduler.store.key
+        with self._cond:
+            if self._schedulers.get(key) is not scheduler or scheduler.subscriptions():
+                return False
+            del self._schedulers[key]
+            # Its queued wake-ups are skipped as stale
+            self._due_at.pop(key, None)
+        scheduler.close()
+        return True
+
+    def notify_schedule_changed(self, store):
+        """Tell the scheduler of `store`, if it has one, that the schedule was replaced."""
+        with self._cond:
+            scheduler = self._schedulers.get(store.key)
+        if scheduler is not None:
+            scheduler.notify_schedule_changed()
+
+    def _wake_at(self, key, ts):
+        """Poll `key` at `ts` unless it is already due earlier. Caller holds the lock."""
+        current = self._due_at.get(key)
+        if current is None or ts < current:
+            self._due_at[key] = ts
+            heapq.heappush(self._wakeups, (ts, key))
+            self._cond.notify()
+
+    def wake(self, key):
+        with self._cond:
+            self._wake_at(key, 0)
+
+    def stop(self):
+        with self._cond:
+            self._stop.set()
+            self._cond.notify()
+
+    def join(self, timeout=None):
+        """Wait for the thread to exit after stop(), e.g. to finish an in-flight dispatch."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop.is_set() and not (self._wakeups and self._wakeups[0][0] <= time.time()):
+                    self._cond.wait(self._wakeups[0][0] - time.time() if self._wakeups else None)
+                if self._stop.is_set():
+                    return
+                ts, key = heapq.heappop(self._wakeups)
+                if self._due_at.get(key) != ts:
+                    continue  # Superseded by an earlier wake-up
+                del self._due_at[key]
+                scheduler = self._schedulers[key]
+            # Polled and sent outside the lock: wake() from a session never waits on a schedule read
+            try:
+                due, timeout = scheduler.poll()
+            except Exception:
+                logger.exception("计算提醒失败")
+                due, timeout = [], scheduler.refresh_interval
+            self.send(due)
+            with self._cond:
+                if self._schedulers.get(key) is scheduler:
+                    self._wake_at(key, time.time() + timeout)
+
+
+reminder_loop = ReminderLoop()
+
+
+def get_reminder_scheduler(store):
+    """
+    Process-wide ReminderScheduler per schedule store, polled by reminder_loop; survives
+    Streamlit reruns because this module is only imported once.
+    """
+    return reminder_loop.scheduler(store)
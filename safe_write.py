@@ -0,0 +1,107 @@
+import os
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive advisory lock on `path` (created if missing), held for the `with` block.
+    Serializes writers across threads and processes; readers never need it, because
+    atomic_write() only ever swaps in complete files.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_umask():
+    # The umask can only be read by setting it, which is not thread-safe: done once, at import
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Mode of files atomic_write() creates, as open() would create them
+NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def _fsync_dir(directory):
+    if fcntl is None:
+        return  # Directories cannot be opened for fsync on Windows
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path, mode="w", **open_kwargs):
+    """
+    Write `path` through a temp file in the same directory that is fsynced and renamed over
+    it when the block exits cleanly, so a reader sees either the old or the new file, never
+    a partial one. On an exception the temp file is removed and `path` is left as it was.
+    The new file keeps the permissions of the one it replaces (a new file gets the usual
+    0666 & ~umask), not the owner-only mode of mkstemp.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            file_mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            file_mode = NEW_FILE_MODE
+        os.chmod(tmp, file_mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    # Make the rename itself durable
+    _fsync_dir(directory)
+
+
+def read_counter(path):
+    """Integer stored in `path` by bump_counter(), 0 if it does not exist yet."""
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def bump_counter(path):
+    """Increment the counter in `path`; call with the writers' file_lock held. Returns the new value."""
+    value = read_counter(path) + 1
+    with atomic_write(path) as f:
+        f.write(str(value))
+    return value
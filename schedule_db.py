@@ -0,0 +1,269 @@
+import os
+import sqlite3
+import threading
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from schedule_import import IMPORT_CHUNK_ROWS, validated_chunks
+from schedule_schema import DAY_DTYPE, DAY_ORDER, TEXT_COLUMNS, TYPED_COLUMNS, normalize_schedule
+from schedule_store import BaseScheduleStore
+
+DEFAULT_DB_PATH = "schedule.db"
+DEFAULT_OWNER = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS owners (
+    owner TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+-- Clustered by owner: loading one timetable is a single range scan
+CREATE TABLE IF NOT EXISTS classes (
+    owner TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    start_min INTEGER NOT NULL,
+    end_min INTEGER NOT NULL,
+    course_name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    PRIMARY KEY (owner, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS classes_owner_day_start ON classes (owner, day, start_min);
+CREATE INDEX IF NOT EXISTS classes_owner_teacher ON classes (owner, teacher);
+"""
+
+ROW_COLUMNS = ", ".join(TYPED_COLUMNS)
+
+# INDEXED BY: without ANALYZE statistics SQLite would rather scan the owner's whole primary-key range
+CURRENT_CLASS_SQL = (
+    f"SELECT {ROW_COLUMNS} FROM classes INDEXED BY classes_owner_day_start "
+    "WHERE owner = ? AND day = ? AND start_min <= ? AND end_min >= ? ORDER BY start_min, seq LIMIT 1"
+)
+NEXT_CLASS_SQL = (
+    f"SELECT {ROW_COLUMNS} FROM classes INDEXED BY classes_owner_day_start "
+    "WHERE owner = ? AND day = ? AND start_min > ? ORDER BY start_min, seq LIMIT 1"
+)
+ANY_CLASS_SQL = "SELECT 1 FROM classes INDEXED BY classes_owner_day_start WHERE owner = ? AND day = ? LIMIT 1"
+CLASS_TIMES_SQL = "SELECT day, start_min, course_name, location FROM classes WHERE owner = ? ORDER BY seq"
+BY_TEACHER_SQL = (
+    f"SELECT {ROW_COLUMNS} FROM classes INDEXED BY classes_owner_teacher "
+    "WHERE owner = ? AND teacher = ? ORDER BY seq"
+)
+
+
+def to_frame(rows):
+    """Rows of (day index, period, start_min, end_min, course, location, teacher) -> typed schedule."""
+    columns = list(zip(*rows)) or [()] * len(TYPED_COLUMNS)
+    df = pd.DataFrame({
+        "day": pd.Categorical.from_codes(np.asarray(columns[0], dtype=np.int8), dtype=DAY_DTYPE),
+        "period": np.asarray(columns[1], dtype=np.int8),
+        "start_min": np.asarray(columns[2], dtype=np.int16),
+        "end_min": np.asarray(columns[3], dtype=np.int16),
+    })
+    for i, column in enumerate(TEXT_COLUMNS, start=4):
+        df[column] = pd.Categorical(list(columns[i]))
+    return df
+
+
+def to_row(row):
+    """One (day index, ...) database row as a Series shaped like a schedule DataFrame row."""
+    return pd.Series([DAY_ORDER[row[0]], *row[1:]], index=TYPED_COLUMNS)
+
+
+class ScheduleDatabase:
+    """
+    One SQLite file (WAL mode) holding the schedules of every owner (a user or a class group),
+    shared by all threads and worker processes on the node. Each owner's schedule carries a
+    version number that is bumped by every write, so readers only reload on change.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        # sqlite3 connections must not be shared between threads; one per thread, reused
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # WAL: readers never block the writer and vice versa
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, owner):
+        """Current version of an owner's schedule, None if it has never been saved."""
+        row = self.connection().execute("SELECT version FROM owners WHERE owner = ?", (owner,)).fetchone()
+        return None if row is None else row[0]
+
+    def owners(self):
+        return [row[0] for row in self.connection().execute("SELECT owner FROM owners ORDER BY owner")]
+
+    def load(self, owner):
+        """(typed schedule, version) of one owner, read from a single snapshot."""
+        conn = self.connection()
+        conn.execute("BEGIN")
+        try:
+            version = self.version(owner)
+            rows = conn.execute(
+                f"SELECT {ROW_COLUMNS} FROM classes WHERE owner = ? ORDER BY seq", (owner,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return to_frame(rows), version
+
+    def class_times(self, owner):
+        """(build_class_times() rows, version) of one owner, read from a single snapshot."""
+        conn = self.connection()
+        conn.execute("BEGIN")
+        try:
+            version = self.version(owner)
+            rows = conn.execute(CLASS_TIMES_SQL, (owner,)).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return rows, version
+
+    def replace(self, owner, chunks):
+        """
+        Replace an owner's schedule with the typed frames in `chunks` in one transaction;
+        if `chunks` raises (e.g. validation of an upload fails) nothing changes.
+        Returns the number of rows written.
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM classes WHERE owner = ?", (owner,))
+            rows = 0
+            for df in chunks:
+                conn.executemany(
+                    f"INSERT INTO classes (owner, seq, {ROW_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    zip(
+                        repeat(owner), range(rows, rows + len(df)),
+                        df["day"].cat.codes.tolist(), df["period"].tolist(),
+                        df["start_min"].tolist(), df["end_min"].tolist(),
+                        *(df[column].astype(str).tolist() for column in TEXT_COLUMNS),
+                    ),
+                )
+                rows += len(df)
+            conn.execute(
+                "INSERT INTO owners (owner, version) VALUES (?, 1) "
+                "ON CONFLICT (owner) DO UPDATE SET version = version + 1",
+                (owner,),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return rows
+
+    def lookup(self, owner, weekday_en, minute):
+        """
+        ScheduleIndex.lookup as indexed queries on (owner, day, start_min):
+        (status, current_row, next_row, minutes_left).
+        """
+        conn = self.connection()
+        day = DAY_ORDER.index(weekday_en)
+        current = conn.execute(CURRENT_CLASS_SQL, (owner, day, minute, minute)).fetchone()
+        after = current[3] if current is not None else minute
+        next_row = conn.execute(NEXT_CLASS_SQL, (owner, day, after)).fetchone()
+
+        if current is not None:
+            return "In Class", to_row(current), None if next_row is None else to_row(next_row), None
+        if next_row is not None:
+            return "Upcoming", None, to_row(next_row), next_row[2] - minute
+        if conn.execute(ANY_CLASS_SQL, (owner, day)).fetchone():
+            return "Done", None, None, None
+        return "Free", None, None, None
+
+    def by_teacher(self, owner, teacher):
+        """An owner's classes taught by `teacher`, via the (owner, teacher) index."""
+        return to_frame(self.connection().execute(BY_TEACHER_SQL, (owner, teacher)).fetchall())
+
+
+class SQLiteScheduleStore(BaseScheduleStore):
+    """
+    ScheduleStore for one owner's schedule in a ScheduleDatabase: the same get / derived /
+    save / import_csv API, with the owner's version row (a primary-key lookup) playing the
+    part of the CSV stat check. An owner that has never been saved starts from `seed_csv`
+    if given (e.g. the existing schedule_data.csv), otherwise empty.
+    """
+
+    def __init__(self, db, owner=DEFAULT_OWNER, seed_csv=None):
+        super().__init__()
+        self.db = db
+        self.owner = owner
+        self.key = f"{os.path.abspath(db.path)}#{owner}"
+        self.location = (os.path.abspath(db.path), owner)
+        self.seed_csv = seed_csv
+        self._db_version = None
+        self._class_times = None
+
+    def _current(self):
+        db_version = self.db.version(self.owner)
+        df, version = self._df, self.version
+        if df is not None and db_version == self._db_version:
+            return df, version
+
+        with self._lock:
+            if db_version is None and self.seed_csv and os.path.exists(self.seed_csv):
+                self.db.replace(self.owner, validated_chunks(self.seed_csv))
+            df, db_version = self.db.load(self.owner)
+            if self._df is None or db_version != self._db_version:
+                self._set(df)
+                self._db_version = db_version
+            return self._df, self.version
+
+    def save(self, df):
+        """Replace the owner's schedule (CSV or typed form)."""
+        if "start_min" not in df.columns:
+            df = normalize_schedule(df)
+        self.db.replace(self.owner, [df])
+
+    def import_csv(self, source, chunksize=IMPORT_CHUNK_ROWS):
+        """Replace the owner's schedule with an uploaded CSV, validated and inserted chunk by chunk."""
+        return self.db.replace(self.owner, validated_chunks(source, chunksize))
+
+    def class_times(self):
+        """
+        build_class_times() of the current schedule straight from the database (same list
+        object while the version is unchanged), so reminder shards holding thousands of
+        owners never build their DataFrames.
+        """
+        db_version = self.db.version(self.owner)
+        cached = self._class_times
+        if cached is not None and cached[0] == db_version:
+            return cached[1]
+        if db_version is None:
+            self._current()  # Seeds the owner from seed_csv, if any
+        rows, db_version = self.db.class_times(self.owner)
+        self._class_times = (db_version, rows)
+        return rows
+
+    def lookup(self, weekday_en, minute):
+        return self.db.lookup(self.owner, weekday_en, minute)
+
+    def by_teacher(self, teacher):
+        return self.db.by_teacher(self.owner, teacher)
+
+
+_databases = {}
+_sqlite_stores = {}
+_db_lock = threading.Lock()
+
+
+def get_sqlite_store(owner=DEFAULT_OWNER, path=DEFAULT_DB_PATH, seed_csv=None):
+    """Process-wide store per (database file, owner); the database handle is shared by all owners."""
+    db_key = os.path.abspath(path)
+    with _db_lock:
+        db = _databases.get(db_key)
+        if db is None:
+            db = _databases[db_key] = ScheduleDatabase(path)
+        store = _sqlite_stores.get((db_key, owner))
+        if store is None:
+            store = _sqlite_stores[(db_key, owner)] = SQLiteScheduleStore(db, owner, seed_csv)
+        return store
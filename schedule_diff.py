@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# A class is identified by these columns; the n-th duplicate of a key pairs with the n-th one
+KEY_COLUMNS = ["day", "period", "course_name"]
+
+
+@dataclass(frozen=True)
+class ScheduleDiff:
+    """
+    Row-level difference between two typed schedules, as positions into each frame:
+    - kept_old[i] / kept_new[i]: the same, unmodified row in the old and the new frame
+    - removed: old rows with no counterpart; added: new rows with no counterpart
+    - changed_old[i] / changed_new[i]: same key, other columns (times, location, teacher) differ
+    - days: every weekday with a removed, added or changed row, in either frame, or whose
+      kept rows come in another order (classes starting together are listed in file order)
+    """
+    kept_old: np.ndarray
+    kept_new: np.ndarray
+    removed: np.ndarray
+    added: np.ndarray
+    changed_old: np.ndarray
+    changed_new: np.ndarray
+    days: frozenset
+
+    @property
+    def empty(self):
+        return not (len(self.removed) or len(self.added) or len(self.changed_old))
+
+    def new_rows(self):
+        """Positions in the new frame that did not exist unmodified before."""
+        return np.sort(np.concatenate([self.added, self.changed_new]))
+
+    def old_to_new(self, n_old):
+        """Array mapping every old position to its new one, -1 where the row is gone or changed."""
+        mapping = np.full(n_old, -1, dtype=np.intp)
+        mapping[self.kept_old] = self.kept_new
+        return mapping
+
+
+def _row_hashes(df, columns=None):
+    # Value-based, so categoricals with different category sets still hash the same
+    return pd.util.hash_pandas_object(df if columns is None else df[columns], index=False).to_numpy()
+
+
+def _numbered(hashes):
+    """
+    Make hashes unique by folding in the occurrence number: the n-th duplicate in one
+    frame pairs with the n-th duplicate in the other.
+    """
+    codes, _ = pd.factorize(hashes)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    run_start = np.repeat(starts, np.diff(np.r_[starts, len(hashes)]))
+    occurrence = np.empty(len(hashes), dtype=np.uint64)
+    occurrence[order] = np.arange(len(hashes)) - run_start
+    return hashes + occurrence * np.uint64(0x9E3779B97F4A7C15)
+
+
+def _match(old_hashes, new_hashes):
+    """Positions (old, new) of pairs with equal numbered hashes."""
+    found = pd.Index(_numbered(new_hashes)).get_indexer(_numbered(old_hashes))
+    old_pos = np.flatnonzero(found >= 0)
+    return old_pos, found[old_pos]
+
+
+def _reordered_days(new, kept_old, kept_new):
+    """Weekdays on which two kept rows swapped places, e.g. an upload that only reorders rows."""
+    in_new_order = np.argsort(kept_new)
+    day_codes = new["day"].cat.codes.to_numpy()[kept_new[in_new_order]]
+    # Each day's kept rows in new order; their old positions must still be increasing
+    by_day = np.argsort(day_codes, kind="stable")
+    codes, old_positions = day_codes[by_day], kept_old[in_new_order][by_day]
+    swapped = (codes[1:] == codes[:-1]) & (old_positions[1:] < old_positions[:-1])
+    categories = new["day"].cat.categories
+    return [str(categories[code]) for code in np.unique(codes[1:][swapped])]
+
+
+def diff_schedules(old, new, key=KEY_COLUMNS):
+    """
+    Compare two typed schedules (normalize_schedule form); returns a ScheduleDiff.
+    Identical rows are paired first, wherever they moved to; the rest are paired by `key`.
+    """
+    kept_old, kept_new = _match(_row_hashes(old), _row_hashes(new))
+
+    left_old = np.setdiff1d(np.arange(len(old)), kept_old, assume_unique=True)
+    left_new = np.setdiff1d(np.arange(len(new)), kept_new, assume_unique=True)
+    pairs_old, pairs_new = _match(
+        _row_hashes(old.iloc[left_old], key), _row_hashes(new.iloc[left_new], key)
+    )
+    changed_old, changed_new = left_old[pairs_old], left_new[pairs_new]
+    removed = np.setdiff1d(left_old, changed_old, assume_unique=True)
+    added = np.setdiff1d(left_new, changed_new, assume_unique=True)
+
+    days = frozenset(
+        [str(d) for d in old["day"].iloc[np.concatenate([removed, changed_old])].unique()]
+        + [str(d) for d in new["day"].iloc[np.concatenate([added, changed_new])].unique()]
+        + _reordered_days(new, kept_old, kept_new)
+    )
+    return ScheduleDiff(kept_old, kept_new, removed, added, changed_old, changed_new, days)
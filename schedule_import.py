@@ -0,0 +1,109 @@
+import csv
+import io
+
+import pandas as pd
+
+from safe_write import atomic_write
+from schedule_schema import ScheduleValidationError, empty_schedule, normalize_schedule, to_csv_frame
+
+IMPORT_CHUNK_ROWS = 50_000
+# Validation keeps going after the first bad chunk, but only this many errors are kept
+MAX_IMPORT_ERRORS = 100
+
+
+def _open_text(source):
+    """`source` (path, binary or text file object) as a text stream for csv.reader, and whether to close it."""
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        return open(source, encoding="utf-8-sig", newline=""), True
+    if isinstance(source, io.TextIOBase):
+        return source, False
+    return io.TextIOWrapper(source, encoding="utf-8-sig", newline=""), False
+
+
+def overlong_rows(source):
+    """
+    (line, message) for every row of a schedule CSV with more fields than its header, and
+    how many there are. read_csv cannot be trusted with these: with index_col=False it
+    drops the extra fields of a row that starts a chunk without a word.
+    File objects are read from their current position and rewound to it afterwards.
+    """
+    start = None if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__") else source.tell()
+    text, close = _open_text(source)
+    errors, total = [], 0
+    try:
+        rows = csv.reader(text)
+        header = next((row for row in rows if row), None)
+        for row in rows:
+            if len(row) > len(header):
+                total += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append((rows.line_num, f"列数多于表头（{len(row)} 列，表头 {len(header)} 列）"))
+    finally:
+        if close:
+            text.close()
+        elif text is not source:
+            text.detach()  # Leave the caller's file object open
+    if start is not None:
+        source.seek(start)
+    return errors, total
+
+
+def validated_chunks(source, chunksize=IMPORT_CHUNK_ROWS):
+    """
+    Yield a schedule CSV (path or file object) `chunksize` rows at a time, in typed form.
+
+    A first pass checks that no row has more fields than the header (overlong_rows); then
+    every chunk goes through normalize_schedule(), so columns, day names, periods and
+    HH:MM times are checked row by row and problems are reported with their file line.
+    After the first bad chunk nothing more is yielded, but the rest is still checked so
+    that ScheduleValidationError, raised at the end, lists every problem. Consumers
+    should therefore only commit what they received once the generator is exhausted.
+    """
+    errors, total_errors = overlong_rows(source)
+    if total_errors:
+        raise ScheduleValidationError(errors, total=total_errors)
+    rows = 0
+    try:
+        # index_col=False: a row's first field must never turn into an index
+        for chunk in pd.read_csv(source, dtype=str, index_col=False, chunksize=chunksize):
+            try:
+                typed = normalize_schedule(chunk, first_line=rows + 2)
+            except ScheduleValidationError as e:
+                if e.errors[0][0] is None:
+                    raise  # Missing columns: nothing else is worth checking
+                total_errors += len(e.errors)
+                errors.extend(e.errors[:MAX_IMPORT_ERRORS - len(errors)])
+            else:
+                if not total_errors:
+                    yield typed
+            rows += len(chunk)
+    except pd.errors.EmptyDataError:
+        raise ScheduleValidationError([(None, "文件为空")])
+    except pd.errors.ParserError as e:
+        # Malformed CSV (e.g. an unterminated quote); pandas names the line itself
+        raise ScheduleValidationError(errors + [(None, str(e).strip())])
+    if total_errors:
+        raise ScheduleValidationError(errors, total=total_errors)
+
+
+def import_csv(source, dest_path, chunksize=IMPORT_CHUNK_ROWS):
+    """
+    Stream a schedule CSV (path or file object) into dest_path through validated_chunks().
+
+    Valid rows are written, normalized, to a temp file next to dest_path that only
+    replaces it (fsync + rename) once the whole upload has passed; on any error
+    dest_path is left untouched. Only one chunk is held in memory at a time.
+
+    Returns the number of rows imported; raises ScheduleValidationError.
+    """
+    rows = 0
+    with atomic_write(dest_path, encoding="utf-8", newline="") as out:
+        header = True
+        for typed in validated_chunks(source, chunksize):
+            to_csv_frame(typed).to_csv(out, header=header, index=False)
+            header = False
+            rows += len(typed)
+        if header:
+            # No rows at all: still write the header so the result is a valid (empty) schedule
+            to_csv_frame(empty_schedule()).to_csv(out, index=False)
+    return rows
@@ -0,0 +1,120 @@
+import copy
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+
+class DayIndex:
+    """
+    Classes of a single weekday, sorted by start time, with start/end as plain lists of minute offsets.
+    `max_ends[i]` is the latest end among the first i+1 classes; it never decreases, so the
+    first class still running at a given minute can be found with a bisect as well.
+    """
+
+    def __init__(self, day_df):
+        order = day_df["start_min"].to_numpy().argsort(kind="stable")
+        self.rows = day_df.iloc[order].reset_index(drop=True)
+        self.starts = self.rows["start_min"].tolist()
+        self.ends = self.rows["end_min"].tolist()
+        self.max_ends = list(accumulate(self.ends, max))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def current(self, minute):
+        """Position of the earliest-starting class with start <= minute <= end, or None."""
+        started = bisect_right(self.starts, minute)
+        if started == 0:
+            return None
+        pos = bisect_left(self.max_ends, minute, 0, started)
+        return pos if pos < started else None
+
+    def next_after(self, minute):
+        """Position of the first class starting strictly after `minute`, or None."""
+        pos = bisect_right(self.starts, minute)
+        return pos if pos < len(self.starts) else None
+
+
+class ScheduleIndex:
+    """Per-weekday DayIndex, built once per schedule version."""
+
+    def __init__(self, df):
+        self.days = self._build_days(df)
+
+    @staticmethod
+    def _build_days(df):
+        if df.empty:
+            return {}
+        return {str(day): DayIndex(day_df) for day, day_df in df.groupby("day", sort=False, observed=True)}
+
+    def patched(self, df, diff):
+        """Index for the next version `df`: only the weekdays touched by `diff` (a ScheduleDiff) are rebuilt."""
+        index = copy.copy(self)
+        index.days = {day: day_index for day, day_index in self.days.items() if day not in diff.days}
+        if diff.days:
+            index.days.update(self._build_days(df[df["day"].isin(list(diff.days))]))
+        return index
+
+    def day(self, weekday_en):
+        return self.days.get(weekday_en)
+
+    def lookup(self, weekday_en, minute):
+        """
+        Returns (status, current_row, next_row, minutes_left) with the same semantics as
+        scanning the day's classes in start-time order:
+        - "In Class": current_row is the running class, next_row the first one starting after it ends
+        - "Upcoming": next_row is the next class, minutes_left the minutes until it starts
+        - "Done": every class today has ended
+        - "Free": no classes that day
+        """
+        day = self.days.get(weekday_en)
+        if day is None or len(day) == 0:
+            return "Free", None, None, None
+
+        pos = day.current(minute)
+        if pos is not None:
+            after = day.next_after(day.ends[pos])
+            next_row = day.rows.iloc[after] if after is not None else None
+            return "In Class", day.rows.iloc[pos], next_row, None
+
+        after = day.next_after(minute)
+        if after is not None:
+            return "Upcoming", None, day.rows.iloc[after], day.starts[after] - minute
+
+        return "Done", None, None, None
+
+
+class DayRows:
+    """
+    Each weekday's classes sorted by start time, split off the schedule the first time that
+    day is asked for and then kept for the schedule version, so a rerun only pays for the
+    day on screen.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        codes = np.unique(df["day"].cat.codes.to_numpy())
+        categories = df["day"].cat.categories
+        # Weekdays with at least one class, Monday..Sunday
+        self.days_present = [str(categories[code]) for code in codes if code >= 0]
+        self._days = {}
+
+    def patched(self, df, diff):
+        """DayRows for the next version `df`, keeping the days `diff` (a ScheduleDiff) did not touch."""
+        day_rows = DayRows(df)
+        day_rows._days = {day: rows for day, rows in self._days.items() if day not in diff.days}
+        return day_rows
+
+    def get(self, weekday_en):
+        rows = self._days.get(weekday_en)
+        if rows is None:
+            day_df = self.df[self.df["day"] == weekday_en]
+            order = day_df["start_min"].to_numpy().argsort(kind="stable")
+            rows = self._days[weekday_en] = day_df.iloc[order].reset_index(drop=True)
+        return rows
+
+    def prefetch(self, *weekdays_en):
+        for weekday_en in weekdays_en:
+            if weekday_en in self.days_present:
+                self.get(weekday_en)
@@ -0,0 +1,142 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# CSV import/export format
+SCHEDULE_COLUMNS = ["day", "period", "start_time", "end_time", "course_name", "location", "teacher"]
+# In-memory form produced at load time (see normalize_schedule)
+TYPED_COLUMNS = ["day", "period", "start_min", "end_min", "course_name", "location", "teacher"]
+TEXT_COLUMNS = ["course_name", "location", "teacher"]
+
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKDAYS_CN = {
+    "Monday": "星期一",
+    "Tuesday": "星期二",
+    "Wednesday": "星期三",
+    "Thursday": "星期四",
+    "Friday": "星期五",
+    "Saturday": "星期六",
+    "Sunday": "星期日"
+}
+DAY_DTYPE = pd.CategoricalDtype(DAY_ORDER, ordered=True)
+
+TIME_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*$")
+# "HH:MM" for every minute of the day, indexed by minute offset
+TIME_LABELS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)], dtype=object)
+
+
+class ScheduleValidationError(ValueError):
+    """
+    Raised with every problem found; `errors` holds (line number, message) pairs.
+    `total` is the real error count when only the first few were kept.
+    """
+
+    def __init__(self, errors, total=None):
+        self.errors = errors
+        self.total = len(errors) if total is None else total
+        shown = "; ".join(f"第 {line} 行: {msg}" if line else msg for line, msg in errors[:10])
+        more = f"（另有 {self.total - 10} 处错误）" if self.total > 10 else ""
+        super().__init__(f"课程表格式错误: {shown}{more}")
+
+
+def time_to_minutes(time_str):
+    """'08:05' -> 485; raises ValueError for anything that is not a valid HH:MM time."""
+    match = TIME_RE.match(str(time_str))
+    if not match:
+        raise ValueError(f"时间格式应为 HH:MM: {time_str!r}")
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        raise ValueError(f"时间超出范围: {time_str!r}")
+    return hour * 60 + minute
+
+
+def format_minutes(minutes):
+    """485 -> '08:05'"""
+    return TIME_LABELS[int(minutes)]
+
+
+def format_time_column(minutes):
+    """Vectorized format_minutes for a column of minute offsets."""
+    return pd.Series(TIME_LABELS[minutes.to_numpy()], index=minutes.index)
+
+
+def parse_time_column(times, column, first_line=2, errors=None):
+    """
+    Minute offsets (int16) for a column of 'HH:MM' strings. Each distinct value is parsed once.
+    Problems are appended to `errors` as (line, message); bad rows get -1.
+    """
+    codes, uniques = pd.factorize(times)
+    parsed = np.empty(len(uniques) + 1, dtype=np.int16)
+    parsed[-1] = -1  # code -1: missing value
+    bad = set()
+    for i, value in enumerate(uniques):
+        try:
+            parsed[i] = time_to_minutes(value)
+        except ValueError:
+            parsed[i] = -1
+            bad.add(i)
+    minutes = parsed[codes]
+    if errors is not None and (bad or (codes < 0).any()):
+        for pos in np.flatnonzero(minutes < 0):
+            errors.append((first_line + int(pos), f"{column} 无效: {times.iloc[pos]!r}"))
+    return minutes
+
+
+def normalize_schedule(raw, first_line=2):
+    """
+    Validate a schedule in CSV form and convert it to the typed in-memory form:
+    categorical day (weekday order) / course / location / teacher, int8 period and
+    int16 start/end minute offsets. Raises ScheduleValidationError listing the bad lines
+    (`first_line` is the file line of raw's first row, 2 for a CSV with a header).
+    """
+    missing = [c for c in SCHEDULE_COLUMNS if c not in raw.columns]
+    if missing:
+        raise ScheduleValidationError([(None, f"缺少列: {', '.join(missing)}")])
+
+    errors = []
+    day = pd.Categorical(raw["day"].astype("string").str.strip(), dtype=DAY_DTYPE)
+    for pos in np.flatnonzero(day.codes < 0):
+        errors.append((first_line + int(pos), f"day 无效: {raw['day'].iloc[pos]!r}"))
+
+    period = pd.to_numeric(raw["period"], errors="coerce")
+    for pos in np.flatnonzero(period.isna().to_numpy() | ~period.between(0, 127).to_numpy()):
+        errors.append((first_line + int(pos), f"period 无效: {raw['period'].iloc[pos]!r}"))
+
+    start = parse_time_column(raw["start_time"], "start_time", first_line, errors)
+    end = parse_time_column(raw["end_time"], "end_time", first_line, errors)
+    for pos in np.flatnonzero((start >= 0) & (end >= 0) & (end < start)):
+        errors.append((first_line + int(pos), "end_time 早于 start_time"))
+
+    if errors:
+        raise ScheduleValidationError(sorted(errors, key=lambda e: e[0]))
+
+    typed = pd.DataFrame({
+        "day": day,
+        "period": period.to_numpy().astype(np.int8),
+        "start_min": start,
+        "end_min": end,
+    }, index=pd.RangeIndex(len(raw)))
+    for column in TEXT_COLUMNS:
+        typed[column] = raw[column].fillna("").astype(str).str.strip().astype("category").array
+    return typed
+
+
+def empty_schedule():
+    return normalize_schedule(pd.DataFrame(columns=SCHEDULE_COLUMNS))
+
+
+def to_csv_frame(df):
+    """Typed schedule back to the CSV column layout (HH:MM times) for writing with to_csv()."""
+    if "start_min" not in df.columns:
+        return df[SCHEDULE_COLUMNS]
+    # Categoricals are written as their values; no need to expand them to strings first
+    out = pd.DataFrame({
+        "day": df["day"],
+        "period": df["period"],
+        "start_time": format_time_column(df["start_min"]),
+        "end_time": format_time_column(df["end_min"]),
+    })
+    for column in TEXT_COLUMNS:
+        out[column] = df[column]
+    return out
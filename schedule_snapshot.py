@@ -0,0 +1,237 @@
+import collections
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from schedule_index import DayRows
+
+# Idle snapshots (no session or reminder thread using them) kept for quick reuse, in MB
+SNAPSHOT_CACHE_MB = float(os.environ.get("SNAPSHOT_CACHE_MB", "256"))
+
+# Start-time windows in minutes, [start, end): 上午 / 下午 / 晚上 in assistant queries
+TIME_BUCKETS = {
+    "morning": (0, 12 * 60),
+    "afternoon": (12 * 60, 18 * 60),
+    "evening": (18 * 60, 24 * 60),
+}
+
+
+def build_class_times(df):
+    """
+    Schedule rows reduced to what the reminder engine needs, parsed once per schedule version:
+    (weekday index, start minute, course name, location).
+    """
+    # day is a categorical in DAY_ORDER, so its codes are the weekday indexes
+    return list(zip(
+        df["day"].cat.codes.tolist(),
+        df["start_min"].tolist(),
+        df["course_name"].tolist(),
+        df["location"].tolist(),
+    ))
+
+
+class ScheduleSnapshot:
+    """
+    One schedule version as a read-only object shared by every session and thread (built
+    once per version through ScheduleStore.derived). Pages read it through views instead
+    of copying the schedule or adding columns to it:
+    - by_day(): one weekday's classes in start-time order (split off lazily, see DayRows)
+    - rows(days, buckets): classes on any of `days` starting in any of TIME_BUCKETS `buckets`,
+      in schedule order
+    - class_times: the reminder engine's (weekday, start, course, location) list
+    Teacher and course lookups go through SearchIndex, whose postings cover them already.
+    Each view is a frame of its own; pandas copy-on-write (always on from pandas 3, hence
+    the pin in requirements.txt) shares the column data until someone writes to it, so
+    whatever a page does to a view never reaches the snapshot.
+    """
+
+    def __init__(self, df, day_rows=None):
+        self._df = df
+        self._day_rows = day_rows if day_rows is not None else DayRows(df)
+        # column -> {value: positions}; filled on first use
+        self._groups = {}
+        self._class_times = None
+
+    def patched(self, df, diff):
+        """Snapshot of the next version `df`; days untouched by `diff` keep their split-off rows."""
+        return ScheduleSnapshot(df, self._day_rows.patched(df, diff))
+
+    def __len__(self):
+        return len(self._df)
+
+    @property
+    def nbytes(self):
+        """Memory held by the schedule and the views built from it so far."""
+        total = int(self._df.memory_usage(deep=True).sum())
+        total += sum(int(rows.memory_usage(deep=True).sum()) for rows in list(self._day_rows._days.values()))
+        total += sum(positions.nbytes for groups in list(self._groups.values()) for positions in groups.values())
+        return total
+
+    @property
+    def class_times(self):
+        if self._class_times is None:
+            self._class_times = build_class_times(self._df)
+        return self._class_times
+
+    @property
+    def frame(self):
+        """The whole schedule."""
+        return self._df.copy(deep=False)
+
+    @property
+    def days_present(self):
+        """Weekdays with at least one class, Monday..Sunday."""
+        return self._day_rows.days_present
+
+    def prefetch(self, *weekdays_en):
+        self._day_rows.prefetch(*weekdays_en)
+
+    def by_day(self, weekday_en):
+        return self._day_rows.get(weekday_en).copy(deep=False)
+
+    def _positions(self, column, value):
+        groups = self._groups.get(column)
+        if groups is None:
+            groups = self._groups[column] = {
+                str(key): positions
+                for key, positions in self._df.groupby(column, sort=False, observed=True).indices.items()
+            }
+        return groups.get(value, np.array([], dtype=np.intp))
+
+    def rows(self, days=(), buckets=()):
+        """Classes on any of `days` (all days if empty) starting in any of `buckets` (any time if empty)."""
+        if not days and not buckets:
+            return self.frame
+        starts = self._df["start_min"].to_numpy()
+        if days:
+            # A row is on exactly one day: no de-duplication needed, just schedule order
+            selected = np.sort(np.concatenate([self._positions("day", day) for day in dict.fromkeys(days)]))
+            if buckets:
+                selected = selected[in_buckets(starts[selected], buckets)]
+        else:
+            selected = np.flatnonzero(in_buckets(starts, buckets))
+        return self._df.iloc[selected]
+
+
+def in_buckets(starts, buckets):
+    """Mask of the start minutes falling in any of `buckets` (TIME_BUCKETS names)."""
+    mask = np.zeros(len(starts), dtype=bool)
+    for bucket in buckets:
+        start, end = TIME_BUCKETS[bucket]
+        mask |= (starts >= start) & (starts < end)
+    return mask
+
+
+class SnapshotLease:
+    """
+    A counted reference to one snapshot. release() it when done; a lease that is garbage
+    collected (e.g. with the session state of a closed session) releases itself.
+    """
+
+    def __init__(self, cache, key, snapshot):
+        self.key = key
+        self.snapshot = snapshot
+        self._cache = cache
+        # The GC may run this in any thread, at any allocation, even one made while that thread
+        # holds the cache's or a store's lock: it only queues the key (deque.append is atomic)
+        self._finalizer = weakref.finalize(self, cache._released.append, key)
+
+    def release(self):
+        self._finalizer()  # Queues the key at most once
+        self._cache.collect()
+
+
+class SnapshotCache:
+    """
+    Process-wide, reference-counted ScheduleSnapshots, one per (store, schedule version),
+    shared by every session and reminder thread, so memory grows with the number of
+    distinct schedules rather than with connected users.
+
+    A version nobody holds anymore is dropped as soon as its store has moved on. The
+    current version of a store nobody is using stays around for the next visitor, up to
+    `max_idle_bytes` in total; beyond that the least recently used store is unloaded
+    (store.invalidate(): it is read again on next use).
+    """
+
+    def __init__(self, max_idle_bytes=SNAPSHOT_CACHE_MB * 1024 * 1024):
+        self.max_idle_bytes = max_idle_bytes
+        # (store key, version) -> [snapshot, store, refs, last released, bytes when released]
+        self._entries = {}
+        self._latest = {}
+        # Keys of released leases, applied by collect()
+        self._released = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, store):
+        """Lease on the snapshot of `store`'s current version."""
+        self.collect()
+        snapshot, version = store.derived_version("snapshot", ScheduleSnapshot, ScheduleSnapshot.patched)
+        key = (store.key, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not snapshot:
+                entry = self._entries[key] = [snapshot, store, 0, 0.0, 0]
+            entry[2] += 1
+            if version > self._latest.get(store.key, -1):
+                previous = (store.key, self._latest.get(store.key))
+                self._latest[store.key] = version
+                if previous in self._entries and self._entries[previous][2] == 0:
+                    del self._entries[previous]
+        return SnapshotLease(self, key, snapshot)
+
+    def collect(self):
+        """Apply the queued lease releases. Call it without holding a store's lock."""
+        unloaded = []
+        with self._lock:
+            went_idle = False
+            while self._released:
+                key = self._released.popleft()
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                entry[2] -= 1
+                if entry[2] > 0:
+                    continue
+                if self._latest.get(key[0]) != key[1]:
+                    del self._entries[key]
+                else:
+                    entry[3] = time.monotonic()
+                    entry[4] = entry[0].nbytes
+                    went_idle = True
+            if went_idle:
+                unloaded = self._evict_idle()
+        # store.invalidate() takes the store's lock: never while holding ours
+        for store in unloaded:
+            store.invalidate()
+
+    def _evict_idle(self):
+        """
+        Drop least recently used idle stores until the idle ones fit the budget and return
+        them, for the caller to invalidate once it has released the lock it holds.
+        """
+        idle = [(entry[3], key, entry[4]) for key, entry in self._entries.items() if entry[2] == 0]
+        total = sum(nbytes for _, _, nbytes in idle)
+        unloaded = []
+        for _, key, nbytes in sorted(idle):
+            if total <= self.max_idle_bytes:
+                break
+            unloaded.append(self._entries.pop(key)[1])
+            self._latest.pop(key[0], None)
+            total -= nbytes
+        return unloaded
+
+    def stats(self):
+        """[{store, version, refs, bytes}] per cached snapshot, largest first."""
+        self.collect()
+        with self._lock:
+            entries = [(key, entry[0], entry[2], entry[4]) for key, entry in self._entries.items()]
+        # Idle snapshots are not touched anymore: reuse the size measured on release
+        stats = [{"store": key[0], "version": key[1], "refs": refs, "bytes": snapshot.nbytes if refs else nbytes}
+                 for key, snapshot, refs, nbytes in entries]
+        return sorted(stats, key=lambda s: -s["bytes"])
+
+
+snapshot_cache = SnapshotCache()
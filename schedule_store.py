@@ -0,0 +1,299 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from safe_write import atomic_write, bump_counter, file_lock, read_counter
+from schedule_diff import diff_schedules
+from schedule_import import IMPORT_CHUNK_ROWS, import_csv
+from schedule_schema import normalize_schedule, to_csv_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # No columnar cache, the CSV is parsed on every cold start
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE_PATH = "schedule_data.csv"
+# Set SCHEDULE_COLUMNAR_CACHE=0 to always parse the CSV
+COLUMNAR_CACHE = os.environ.get("SCHEDULE_COLUMNAR_CACHE", "1") not in ("0", "false", "False")
+
+
+def columnar_path(csv_path):
+    """schedule_data.csv -> schedule_data.arrow"""
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+
+def lock_path(csv_path):
+    """schedule_data.csv -> schedule_data.lock, the writers' advisory lock"""
+    return os.path.splitext(csv_path)[0] + ".lock"
+
+
+def version_path(csv_path):
+    """schedule_data.csv -> schedule_data.version, bumped by every save"""
+    return os.path.splitext(csv_path)[0] + ".version"
+
+
+def write_columnar(df, path, stat_key, digest):
+    """
+    Write the typed schedule as an uncompressed Arrow IPC file, tagged with the CSV's
+    stat key (ScheduleStore._read_stat) and content hash it was parsed from. Written to a temp file and renamed into
+    place, so readers in other processes never see a half-written cache.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"csv_stat"] = ":".join(map(str, stat_key)).encode()
+    metadata[b"csv_digest"] = digest.encode()
+    table = table.replace_schema_metadata(metadata)
+    with atomic_write(path, "wb") as f, pa_ipc.new_file(f, table.schema) as writer:
+        writer.write_table(table)
+
+
+def open_columnar(path):
+    """
+    Memory-map a cache written by write_columnar(); returns (reader, csv_stat, csv_digest).
+    Only the footer and schema are read here, the columns are paged in by read_columnar().
+    """
+    reader = pa_ipc.open_file(pa.memory_map(path, "r"))
+    metadata = reader.schema.metadata or {}
+    stat_key = tuple(int(v) for v in metadata[b"csv_stat"].decode().split(":"))
+    return reader, stat_key, metadata[b"csv_digest"].decode()
+
+
+def read_columnar(reader):
+    # Numeric columns stay backed by the mapped pages (shared through the OS cache);
+    # only the categorical codes and the small dictionaries are materialized
+    return reader.read_all().to_pandas(split_blocks=True)
+
+
+class BaseScheduleStore:
+    """
+    Versioning shared by the schedule stores: every newly loaded schedule gets the next
+    `version`, and derived data (indexes, aggregates) is cached per version. Subclasses
+    implement _current(), which returns a consistent (df, version) pair, and save().
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._df = None
+        self._derived = {}
+        self._previous = None
+        self._diff = None
+
+    def get(self):
+        """Return the current schedule DataFrame (shared, treat as read-only)."""
+        return self._current()[0]
+
+    def _current(self):
+        raise NotImplementedError
+
+    def _set(self, df):
+        """Install a newly loaded schedule as the next version. Caller holds the lock."""
+        if self._df is not None:
+            # Kept for one version, so derived data can be patched from the diff instead of rebuilt
+            self._previous = (self.version, self._df)
+            self._diff = None
+        self._df = df
+        self.version += 1
+
+    def diff(self, since_version, version):
+        """
+        ScheduleDiff from `since_version` to `version` (computed once), or None unless those
+        are the previous and the current version.
+        """
+        with self._lock:
+            previous, df, cached = self._previous, self._df, self._diff
+            if previous is None or previous[0] != since_version or self.version != version:
+                return None
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        diff = diff_schedules(previous[1], df)
+        with self._lock:
+            if self.version == version:
+                self._diff = (version, diff)
+        return diff
+
+    def derived(self, name, build, patch=None):
+        """
+        Return build(df) for the current schedule version, building it at most once per version.
+        Used for indexes and aggregates that are expensive to recompute on every rerun.
+        With `patch`, a value built for the previous version is updated with
+        patch(old_value, df, diff) instead of rebuilt (see schedule_diff).
+        """
+        return self.derived_version(name, build, patch)[0]
+
+    def derived_version(self, name, build, patch=None):
+        """derived() and the schedule version it belongs to, as (value, version)."""
+        df, version = self._current()
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1], version
+        diff = self.diff(cached[0], version) if cached is not None and patch is not None else None
+        value = patch(cached[1], df, diff) if diff is not None else build(df)
+        with self._lock:
+            if self.version == version:
+                self._derived[name] = (version, value)
+        return value, version
+
+    def invalidate(self):
+        with self._lock:
+            self._df = None
+            self._derived.clear()
+            self._previous = None
+            self._diff = None
+
+
+class ScheduleStore(BaseScheduleStore):
+    """
+    Owns the parsed schedule table for one CSV file, in the typed form of normalize_schedule().
+    The file is only re-parsed when its contents actually change: a cheap stat()
+    (mtime + size + inode) is checked on every call, and a content hash decides whether
+    a changed stat really means new data (e.g. `touch` or a re-save of the same bytes).
+
+    Saves take an advisory lock (lock_path), write a temp file, fsync it and rename it over
+    the CSV, so concurrent writers in any process are serialized and readers never see a
+    truncated file. Each save also bumps the counter in version_path(), a schedule version
+    that is monotonic across processes (see disk_version); readers check it together with
+    the stat, so a save in any process is picked up even if it leaves the stat unchanged.
+    (`version`, which derived data is cached under, stays per process: it also counts
+    edits made outside the store, which do not bump the counter.)
+
+    With `columnar_cache` (needs pyarrow) the typed table is also kept in an Arrow file
+    next to the CSV (see columnar_path). A cold start whose CSV matches that file maps it
+    instead of parsing; the CSV stays the source of truth and the import/export format.
+    """
+
+    def __init__(self, path=DEFAULT_SCHEDULE_PATH, columnar_cache=COLUMNAR_CACHE):
+        super().__init__()
+        self.path = path
+        # Identifies this schedule in process-wide caches shared with other stores
+        self.key = os.path.abspath(path)
+        # (schedule file, owner) for processes that open the same schedule themselves
+        self.location = (self.key, None)
+        self.cache_path = columnar_path(path) if columnar_cache and pa is not None else None
+        self._stat_key = None
+        self._digest = None
+
+    def _read_stat(self):
+        """
+        What tells this process the file changed: the save counter (disk_version) and the
+        CSV's stat. Every save renames a new file into place, so the inode changes even if
+        mtime and size do not; but an inode is reused once the file it belonged to is gone,
+        and mtimes can be coarse, so two saves can leave the same stat. They never leave the
+        same counter. The counter is read first: saves bump it after the rename, so a new
+        counter always comes with the new file.
+        """
+        disk_version = self.disk_version()
+        st = os.stat(self.path)
+        return (disk_version, st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def disk_version(self):
+        """Number of saves ever made to this CSV, by any process; only grows."""
+        return read_counter(version_path(self.path))
+
+    def _current(self):
+        # (df, version) pair read consistently, so derived data is never filed under the wrong version
+        stat_key = self._read_stat()
+        df, version = self._df, self.version
+        if df is not None and stat_key == self._stat_key:
+            return df, version
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            stat_key = self._read_stat()
+            if self._df is not None and stat_key == self._stat_key:
+                return self._df, self.version
+
+            cached = self._open_cache()
+            if cached is not None and cached[1] == stat_key:
+                # CSV untouched since the cache was written: no need to even read it
+                digest = cached[2]
+                if self._df is None or digest != self._digest:
+                    self._set(read_columnar(cached[0]))
+                    self._digest = digest
+                self._stat_key = stat_key
+                return self._df, self.version
+
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+            if self._df is None or digest != self._digest:
+                if cached is not None and cached[2] == digest:
+                    df = read_columnar(cached[0])
+                else:
+                    df = normalize_schedule(pd.read_csv(io.BytesIO(raw), dtype=str))
+                self._set(df)
+                self._digest = digest
+            if cached is None or cached[1:] != (stat_key, digest):
+                self._write_cache(stat_key, digest)
+            self._stat_key = stat_key
+            return self._df, self.version
+
+    def _open_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        try:
+            return open_columnar(self.cache_path)
+        except Exception as e:
+            logger.warning("列式缓存不可用，改为解析 CSV: %s", e)
+            return None
+
+    def _write_cache(self, stat_key, digest):
+        if self.cache_path is None:
+            return
+        try:
+            write_columnar(self._df, self.cache_path, stat_key, digest)
+        except Exception as e:
+            # Only a cache: the CSV has been parsed and is used as is
+            logger.warning("写入列式缓存失败: %s", e)
+
+    def save(self, df):
+        """
+        Write a schedule (CSV or typed form) back as CSV, atomically and under the writers' lock.
+        Returns the new disk_version(); the columnar cache follows on the next read.
+        """
+        with file_lock(lock_path(self.path)):
+            with atomic_write(self.path, encoding="utf-8", newline="") as f:
+                to_csv_frame(df).to_csv(f, index=False)
+            disk_version = bump_counter(version_path(self.path))
+        with self._lock:
+            # Force the next get() to look at the file again
+            self._stat_key = None
+        return disk_version
+
+    def import_csv(self, source, chunksize=IMPORT_CHUNK_ROWS):
+        """Replace the schedule with an uploaded CSV via the streaming, validating importer."""
+        # Readers keep seeing the old file until the validated copy is renamed over it
+        with file_lock(lock_path(self.path)):
+            rows = import_csv(source, self.path, chunksize)
+            bump_counter(version_path(self.path))
+        with self._lock:
+            self._stat_key = None
+        return rows
+
+    def invalidate(self):
+        super().invalidate()
+        with self._lock:
+            self._stat_key = None
+            self._digest = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=DEFAULT_SCHEDULE_PATH):
+    """Process-wide store per file path, shared by every session and the reminder thread."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ScheduleStore(path)
+        return store
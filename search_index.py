@@ -0,0 +1,155 @@
+import copy
+import os
+import unicodedata
+
+import numpy as np
+from thefuzz import process, fuzz
+
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process, utils as rf_utils
+except ImportError:  # thefuzz alone still works, one extract() pass per field
+    rf_process = None
+
+SEARCH_FIELDS = ["day", "course_name", "teacher", "location"]
+# Fuzzy fallback order: the first field with a match wins
+FUZZY_FIELDS = ["course_name", "teacher", "location"]
+# Threads used by rapidfuzz's cdist (-1 = all cores)
+FUZZY_WORKERS = int(os.environ.get("FUZZY_WORKERS", "1"))
+
+
+def normalize(text):
+    """Case- and width-insensitive form used for both the index and the query."""
+    return unicodedata.normalize("NFKC", str(text)).casefold().strip()
+
+
+class SearchIndex:
+    """
+    Everything smart_search needs, built once per schedule version:
+    - postings: field -> {normalized value: row positions}, an inverted index over day/course/teacher/location
+    - choices: distinct course, teacher and location names for fuzzy matching, also flattened
+      into one list so a query is scored against all of them in a single rapidfuzz cdist call
+    - content: the normalized "day course teacher location" line per row, only for queries spanning fields
+
+    A query without whitespace can only match inside a single field, so it is answered from
+    the distinct values (a few hundred) instead of scanning every row.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.postings = {}
+        for field in SEARCH_FIELDS:
+            # Categorical columns: normalize() runs once per distinct value, not per row
+            values = df[field].map(normalize)
+            self.postings[field] = dict(values.groupby(values, sort=False, observed=True).indices)
+        self.choices = {field: [str(v) for v in df[field].unique()] for field in FUZZY_FIELDS}
+        self._all_choices = [c for field in FUZZY_FIELDS for c in self.choices[field]]
+        self._content = None
+
+    def patched(self, df, diff):
+        """
+        Index for the next version `df`, given the ScheduleDiff from self.df: postings (and content,
+        if built) of unchanged rows are moved to their new positions, only new or changed rows
+        are normalized.
+        """
+        index = copy.copy(self)
+        index.df = df
+        mapping = diff.old_to_new(len(self.df))
+        new_rows = diff.new_rows()
+        index.postings = {}
+        for field in SEARCH_FIELDS:
+            postings = {}
+            for value, positions in self.postings[field].items():
+                moved = mapping[positions]
+                moved = moved[moved >= 0]
+                if len(moved):
+                    postings[value] = moved
+            values = df[field].iloc[new_rows].map(normalize)
+            for value, positions in values.groupby(values, sort=False, observed=True).indices.items():
+                positions = new_rows[positions]
+                postings[value] = np.concatenate([postings[value], positions]) if value in postings else positions
+            index.postings[field] = postings
+        index.choices = {field: [str(v) for v in df[field].unique()] for field in FUZZY_FIELDS}
+        index._all_choices = [c for field in FUZZY_FIELDS for c in index.choices[field]]
+        if self._content is not None:
+            content = np.empty(len(df), dtype=object)
+            content[diff.kept_new] = np.asarray(self._content, dtype=object)[diff.kept_old]
+            content[new_rows] = self._content_lines(df.iloc[new_rows])
+            index._content = content.tolist()
+        return index
+
+    @staticmethod
+    def _content_lines(df):
+        parts = [df[field].astype(str) for field in SEARCH_FIELDS]
+        return (parts[0] + " " + parts[1] + " " + parts[2] + " " + parts[3]).map(normalize).tolist()
+
+    @property
+    def content(self):
+        # Built lazily: only multi-word queries need it
+        if self._content is None:
+            self._content = self._content_lines(self.df)
+        return self._content
+
+    def rows(self, positions):
+        return self.df.iloc[np.sort(np.asarray(positions, dtype=np.intp))]
+
+    def _rows_for_values(self, field, values):
+        postings = self.postings[field]
+        positions = [postings[normalize(v)] for v in values if normalize(v) in postings]
+        return np.unique(np.concatenate(positions)) if positions else np.array([], dtype=np.intp)
+
+    def keyword_positions(self, query):
+        q = normalize(query)
+        if any(ch.isspace() for ch in q):
+            return np.array([i for i, line in enumerate(self.content) if q in line], dtype=np.intp)
+        hits = [
+            positions
+            for field in SEARCH_FIELDS
+            for value, positions in self.postings[field].items()
+            if q in value
+        ]
+        return np.unique(np.concatenate(hits)) if hits else np.array([], dtype=np.intp)
+
+    def fuzzy_matches(self, query, limit=3, threshold=60, workers=None):
+        """Best `limit` names scoring above `threshold` (partial_ratio), per field: {field: [names]}"""
+        if rf_process is None:
+            matches = {}
+            for field in FUZZY_FIELDS:
+                best_matches = process.extract(query, self.choices[field], limit=limit, scorer=fuzz.partial_ratio)
+                matches[field] = [m[0] for m in best_matches if m[1] > threshold]
+            return matches
+
+        # One vectorized pass over every course, teacher and location name;
+        # scores below the threshold come back as 0 and let rapidfuzz bail out early
+        scores = rf_process.cdist(
+            [query], self._all_choices,
+            scorer=rf_fuzz.partial_ratio, processor=rf_utils.default_process,
+            score_cutoff=threshold, workers=FUZZY_WORKERS if workers is None else workers,
+        )[0]
+        matches, start = {}, 0
+        for field in FUZZY_FIELDS:
+            field_scores = scores[start:start + len(self.choices[field])]
+            start += len(self.choices[field])
+            if len(field_scores) > limit:
+                top = np.argpartition(-field_scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(field_scores))
+            top = top[np.argsort(-field_scores[top], kind="stable")]
+            matches[field] = [self.choices[field][i] for i in top if field_scores[i] > threshold]
+        return matches
+
+    def search(self, query):
+        if not query or self.df.empty:
+            return self.df.iloc[0:0]
+
+        # Simple keyword matching first
+        positions = self.keyword_positions(query)
+
+        # If no exact match, try fuzzy on course name, then teacher, then location
+        if len(positions) == 0:
+            matches = self.fuzzy_matches(query)
+            for field in FUZZY_FIELDS:
+                if matches[field]:
+                    positions = self._rows_for_values(field, matches[field])
+                    break
+
+        return self.rows(positions)